@@ -0,0 +1,174 @@
+"""
+Admission - Disk-space and per-device writer limits checked before a task starts writing
+"""
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import threading
+from itertools import count
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from fair_share import DEFAULT_PRIORITY, PRIORITY_WEIGHTS
+
+
+logger = logging.getLogger(__name__)
+
+# Rough output bitrates (kbit/s) for formats whose size doesn't follow audio_quality
+FORMAT_BITRATES = {'opus': 160, 'native': 160, 'm4a': 160, 'ogg': 160, 'flac': 1000, 'wav': 1411}
+DEFAULT_TRACK_SECONDS = 240
+# Track counts assumed when a URL can't be sized up front
+DEFAULT_TRACK_COUNTS = {'track': 1, 'album': 15, 'playlist': 100, 'artist': 200}
+SIZE_MARGIN = 1.15  # tags, cover art and bitrate variance
+RECHECK_INTERVAL = 2.0  # seconds between free-space re-reads while tasks wait
+
+
+def bitrate_kbps(config: dict) -> int:
+    audio_format = config.get('audio_format', 'mp3')
+    if audio_format == 'mp3':
+        return int(config.get('audio_quality', '320k').rstrip('k'))
+    return FORMAT_BITRATES.get(audio_format, 320)
+
+
+def estimate_bytes(durations: Iterable[Optional[float]], config: dict) -> int:
+    """Expected size on disk of tracks with the given durations (seconds; None = unknown)"""
+    seconds = sum(d or DEFAULT_TRACK_SECONDS for d in durations)
+    return int(seconds * bitrate_kbps(config) * 1000 / 8 * SIZE_MARGIN)
+
+
+def device_of(path: Path) -> int:
+    """Device id of the volume `path` is (or would be) on"""
+    path = Path(path).absolute()
+    for candidate in (path, *path.parents):
+        try:
+            return os.stat(candidate).st_dev
+        except OSError:
+            continue
+    return 0
+
+
+class AdmissionController:
+    """
+    A task is admitted once its target volume has room for its estimated size on top
+    of what already admitted tasks still have to write (plus `min_free_bytes`), and the
+    volume has fewer than `max_writers` tasks writing to it. Until then it waits.
+    When a slot or space frees up, waiting tasks on that volume go by priority class,
+    then arrival; a higher-priority task that fits is never held behind bulk writers.
+
+    `remaining_fraction(task_id)` tells how much of an admitted task is still to be
+    written, so its reservation shrinks as its files land and show up in disk usage.
+    """
+
+    def __init__(self, remaining_fraction: Callable[[str], float], min_free_bytes: int = 0, max_writers: int = 0):
+        self.remaining_fraction = remaining_fraction
+        self.min_free_bytes = min_free_bytes
+        self.max_writers = max_writers
+        self._cond = threading.Condition()
+        self.admitted = {}  # task_id -> {'device', 'path', 'bytes'}
+        self.waiting = {}  # task_id -> {'device', 'path', 'bytes', 'rank'}
+        self._seq = count()
+
+    def configure(self, min_free_bytes: int, max_writers: int):
+        with self._cond:
+            self.min_free_bytes = min_free_bytes
+            self.max_writers = max_writers
+            self._cond.notify_all()
+
+    def _reserved(self, device: int) -> int:
+        return sum(
+            int(r['bytes'] * max(0.0, min(1.0, self.remaining_fraction(task_id))))
+            for task_id, r in self.admitted.items()
+            if r['device'] == device
+        )
+
+    def _writers(self, device: int) -> int:
+        return sum(1 for r in self.admitted.values() if r['device'] == device)
+
+    def _next_in_line(self, task_id: str, device: int, room: int) -> bool:
+        """Whether `task_id` goes before every other waiter on `device` that fits in `room` bytes"""
+        fitting = [(r['rank'], t) for t, r in self.waiting.items() if r['device'] == device and r['bytes'] <= room]
+        return bool(fitting) and min(fitting)[1] == task_id
+
+    def admit(
+        self,
+        task_id: str,
+        path: Path,
+        size: int,
+        should_abort: Callable[[], bool] | None = None,
+        on_wait: Callable[[str], None] | None = None,
+        priority: str | None = None,
+    ) -> dict:
+        """
+        Block until the task may start writing `size` bytes under `path`. Returns
+        {'admitted': bool, 'error': str | None}; a task larger than the volume's
+        current free space is refused straight away.
+        """
+        device = device_of(path)
+        request = {'device': device, 'path': str(path), 'bytes': size}
+        weight = PRIORITY_WEIGHTS.get(priority, PRIORITY_WEIGHTS[DEFAULT_PRIORITY])
+        with self._cond:
+            if task_id in self.admitted:
+                self.admitted[task_id] = request
+                return {'admitted': True, 'error': None}
+            self.waiting[task_id] = {**request, 'rank': (-weight, next(self._seq))}
+            announced = None
+            try:
+                while True:
+                    if should_abort and should_abort():
+                        return {'admitted': False, 'error': 'Cancelled by user'}
+                    free = shutil.disk_usage(path).free
+                    # Running tasks only use space up, so a task that doesn't fit now never will
+                    if size > free - self.min_free_bytes:
+                        return {
+                            'admitted': False,
+                            'error': (
+                                f"Not enough disk space: needs about {size / 1e9:.2f} GB, "
+                                f"{max(0, free - self.min_free_bytes) / 1e9:.2f} GB available"
+                            ),
+                        }
+
+                    reserved = self._reserved(device)
+                    room = free - reserved - self.min_free_bytes
+                    if self.max_writers and self._writers(device) >= self.max_writers:
+                        reason = f'waiting for one of {self.max_writers} writer slot(s) on this disk'
+                    elif size > room:
+                        reason = f'waiting for disk space ({reserved / 1e9:.2f} GB reserved by running tasks)'
+                    elif not self._next_in_line(task_id, device, room):
+                        reason = 'waiting behind higher-priority or earlier tasks on this disk'
+                    else:
+                        self.admitted[task_id] = request
+                        self._cond.notify_all()  # the next in line may fit as well
+                        return {'admitted': True, 'error': None}
+
+                    if on_wait and reason != announced:
+                        on_wait(reason)
+                        announced = reason
+                    self._cond.wait(timeout=RECHECK_INTERVAL)
+            finally:
+                if self.waiting.pop(task_id, None):
+                    self._cond.notify_all()  # whoever was queued behind this task
+
+    def release(self, task_id: str):
+        with self._cond:
+            if self.admitted.pop(task_id, None):
+                self._cond.notify_all()
+
+    def status(self) -> dict:
+        with self._cond:
+            devices = {}
+            for task_id, r in list(self.admitted.items()) + list(self.waiting.items()):
+                d = devices.setdefault(r['device'], {'path': r['path'], 'writers': [], 'waiting': []})
+                d['writers' if task_id in self.admitted else 'waiting'].append(task_id)
+            for device, d in devices.items():
+                d['reserved_bytes'] = self._reserved(device)
+                try:
+                    d['free_bytes'] = shutil.disk_usage(d['path']).free
+                except OSError:
+                    d['free_bytes'] = None
+            return {
+                'min_free_bytes': self.min_free_bytes,
+                'max_writers_per_device': self.max_writers,
+                'devices': list(devices.values()),
+            }
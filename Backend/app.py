@@ -2,10 +2,13 @@
 GroveGrab - Spotify Downloader Backend
 Flask server with SpotDL integration
 """
+import startup  # first, so the cold-start timing covers every other import
+
 from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 import os
 import json
+import hashlib
 import threading
 import uuid
 from pathlib import Path
@@ -21,15 +24,22 @@ CORS(app)
 
 # Import download manager after app initialization
 from download_manager import DownloadManager
+from config_store import ConfigError, TUNABLE_SETTINGS
+from fair_share import DEFAULT_PRIORITY, PRIORITY_WEIGHTS
+from scheduler import ScheduleError
+startup.mark('imports')
 
 # Initialize download manager
 download_manager = DownloadManager()
+startup.mark('download_manager')
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
+        'ready': startup.is_ready(),
+        'startup': startup.report(),
         'timestamp': datetime.now().isoformat()
     })
 
@@ -42,19 +52,25 @@ def handle_config():
             'has_credentials': config.get('has_credentials', False),
             'default_download_path': config.get('default_download_path', ''),
             'audio_format': config.get('audio_format', 'mp3'),
-            'audio_quality': config.get('audio_quality', '320k')
+            'audio_quality': config.get('audio_quality', '320k'),
+            **{key: config.get(key) for key in TUNABLE_SETTINGS}
         })
     
     elif request.method == 'POST':
         data = request.json
-        success = download_manager.update_config(
-            client_id=data.get('client_id'),
-            client_secret=data.get('client_secret'),
-            redirect_uri=data.get('redirect_uri', 'http://localhost:8888/callback'),
-            download_path=data.get('download_path'),
-            audio_format=data.get('audio_format', 'mp3'),
-            audio_quality=data.get('audio_quality', '320k')
-        )
+        try:
+            success = download_manager.update_config(
+                client_id=data.get('client_id'),
+                client_secret=data.get('client_secret'),
+                # Fields left out stay as they are (None values are not applied)
+                redirect_uri=data.get('redirect_uri'),
+                download_path=data.get('download_path'),
+                audio_format=data.get('audio_format'),
+                audio_quality=data.get('audio_quality'),
+                **{key: data[key] for key in TUNABLE_SETTINGS if key in data}
+            )
+        except ConfigError as e:
+            return jsonify({'error': str(e)}), 400
         
         if success:
             return jsonify({'message': 'Configuration updated successfully'})
@@ -98,22 +114,34 @@ def preload_metadata():
     
     return jsonify({'task_id': task_id, 'status': 'started'})
 
+def client_key():
+    """Who a request is accounted to for fair sharing: its API key (hashed), client id, or address"""
+    api_key = request.headers.get('X-API-Key')
+    if api_key:
+        return 'key:' + hashlib.sha256(api_key.encode()).hexdigest()[:12]
+    return request.headers.get('X-Client-Id') or request.remote_addr or 'local'
+
 @app.route('/api/download', methods=['POST'])
 def start_download():
     """Start downloading from Spotify URL"""
     data = request.json
     url = data.get('url', '').strip()
     download_path = data.get('download_path')
+    parallel = data.get('parallel')  # None -> use the configured default
+    priority = data.get('priority') or DEFAULT_PRIORITY
     
     if not url:
         return jsonify({'error': 'URL is required'}), 400
+    if priority not in PRIORITY_WEIGHTS:
+        return jsonify({'error': f"priority must be one of {', '.join(PRIORITY_WEIGHTS)}"}), 400
     
     task_id = str(uuid.uuid4())
     
     # Start download in background thread
     thread = threading.Thread(
         target=download_manager.start_download,
-        args=(task_id, url, download_path)
+        args=(task_id, url, download_path, parallel),
+        kwargs={'priority': priority, 'client': client_key()}
     )
     thread.daemon = True
     thread.start()
@@ -126,6 +154,133 @@ def get_tasks():
     tasks = download_manager.get_all_tasks()
     return jsonify(tasks)
 
+@app.route('/api/sync', methods=['GET', 'POST'])
+def handle_sync():
+    """List synced playlists, or start an incremental sync of a playlist"""
+    if request.method == 'GET':
+        return jsonify(download_manager.get_sync_snapshots())
+
+    data = request.json
+    url = data.get('url', '').strip()
+    download_path = data.get('download_path')
+    prune = data.get('prune', False)
+    priority = data.get('priority') or DEFAULT_PRIORITY
+
+    if not url:
+        return jsonify({'error': 'URL is required'}), 400
+    if not isinstance(prune, bool):
+        # Pruning deletes library files, so only an explicit JSON true turns it on
+        return jsonify({'error': f"prune must be true or false, got {prune!r}"}), 400
+    if priority not in PRIORITY_WEIGHTS:
+        return jsonify({'error': f"priority must be one of {', '.join(PRIORITY_WEIGHTS)}"}), 400
+
+    task_id = str(uuid.uuid4())
+
+    thread = threading.Thread(
+        target=download_manager.start_sync,
+        args=(task_id, url, download_path, prune),
+        kwargs={'priority': priority, 'client': client_key()}
+    )
+    thread.daemon = True
+    thread.start()
+
+    return jsonify({'task_id': task_id, 'status': 'started'})
+
+@app.route('/api/concurrency', methods=['GET', 'POST'])
+def handle_concurrency():
+    """Get the concurrency controller's state and recent decisions, or pin/unpin its limit"""
+    if request.method == 'POST':
+        data = request.json or {}
+        try:
+            return jsonify(download_manager.set_concurrency_override(data.get('limit')))
+        except ConfigError as e:
+            return jsonify({'error': str(e)}), 400
+    return jsonify(download_manager.get_concurrency())
+
+@app.route('/api/cache', methods=['GET'])
+def get_media_cache():
+    """Get size and hit/miss counters of the shared album-art/lyrics cache"""
+    return jsonify(download_manager.get_media_cache())
+
+@app.route('/api/admission', methods=['GET'])
+def get_admission():
+    """Get per-disk writers, waiting tasks and reserved space of the admission controller"""
+    return jsonify(download_manager.get_admission())
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Aggregate the event journal: throughput over time, failure rates, slowest sources"""
+    hours = min(max(0.1, request.args.get('hours', 24, type=float)), 24 * 366)
+    bucket_minutes = max(1, request.args.get('bucket_minutes', 60, type=int))
+    if hours * 60 / bucket_minutes > 2000:
+        return jsonify({'error': 'Too many buckets; use a larger bucket_minutes'}), 400
+    top = min(max(1, request.args.get('top', 10, type=int)), 100)
+    return jsonify(download_manager.get_stats(hours, bucket_minutes, top))
+
+@app.route('/api/schedules', methods=['GET', 'POST'])
+def handle_schedules():
+    """List scheduled jobs (with the off-peak window and bandwidth cap in force), or add one"""
+    if request.method == 'GET':
+        return jsonify(download_manager.get_schedules())
+
+    data = request.json or {}
+    if not isinstance(data.get('url'), str) or not data['url'].strip():
+        return jsonify({'error': 'URL is required'}), 400
+    try:
+        job = download_manager.add_schedule({**data, 'url': data['url'].strip()})
+    except ScheduleError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(job)
+
+@app.route('/api/schedules/<job_id>', methods=['PATCH', 'DELETE'])
+def handle_schedule(job_id):
+    """Change (cron, run_at, enabled, ...) or delete a scheduled job"""
+    if request.method == 'DELETE':
+        if download_manager.delete_schedule(job_id):
+            return jsonify({'message': 'Schedule deleted'})
+        return jsonify({'error': 'Schedule not found'}), 404
+    try:
+        job = download_manager.update_schedule(job_id, request.json or {})
+    except ScheduleError as e:
+        return jsonify({'error': str(e)}), 400
+    if not job:
+        return jsonify({'error': 'Schedule not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/schedules/<job_id>/run', methods=['POST'])
+def run_schedule(job_id):
+    """Start a scheduled job now, ignoring its schedule and the off-peak window"""
+    task_id = download_manager.run_schedule(job_id)
+    if not task_id:
+        return jsonify({'error': 'Schedule not found'}), 404
+    return jsonify({'task_id': task_id, 'status': 'started'})
+
+@app.route('/api/workers', methods=['GET'])
+def get_workers():
+    """Get the worker processes registered on the job queue (queue mode only)"""
+    return jsonify(download_manager.get_workers())
+
+@app.route('/api/tasks/archive', methods=['GET'])
+def get_archived_tasks():
+    """Get a page of archived (evicted) tasks, newest first"""
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 50, type=int)
+    status = request.args.get('status')
+    return jsonify(download_manager.get_archived_tasks(page=page, per_page=per_page, status=status))
+
+@app.route('/api/tasks/<task_id>/tracks', methods=['GET'])
+def get_task_tracks(task_id):
+    """Get a page of a task's tracks (grows while an artist's discography is being listed)"""
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = min(max(1, request.args.get('limit', 100, type=int)), 1000)
+    status = request.args.get('status')
+    page = download_manager.get_task_tracks(task_id, offset=offset, limit=limit, status=status)
+    
+    if page:
+        return jsonify(page)
+    else:
+        return jsonify({'error': 'Task not found'}), 404
+
 @app.route('/api/tasks/<task_id>', methods=['GET'])
 def get_task(task_id):
     """Get specific task status"""
@@ -156,6 +311,26 @@ def cancel_task(task_id):
     else:
         return jsonify({'error': 'Failed to cancel or task not found'}), 400
 
+@app.route('/api/tasks/<task_id>/pause', methods=['POST'])
+def pause_task(task_id):
+    """Stop a running task, keeping the tracks it already downloaded"""
+    success = download_manager.pause_task(task_id)
+    
+    if success:
+        return jsonify({'message': 'Task paused'})
+    else:
+        return jsonify({'error': 'Failed to pause or task not running'}), 400
+
+@app.route('/api/tasks/<task_id>/resume', methods=['POST'])
+def resume_task(task_id):
+    """Continue a paused task from its first unfinished track"""
+    success = download_manager.resume_task(task_id)
+    
+    if success:
+        return jsonify({'message': 'Task resumed'})
+    else:
+        return jsonify({'error': 'Failed to resume or task not paused'}), 400
+
 @app.route('/api/tasks/<task_id>', methods=['DELETE'])
 def delete_task(task_id):
     """Delete a task"""
@@ -184,4 +359,13 @@ if __name__ == '__main__':
     print("Press CTRL+C to stop")
     print("=" * 60)
     
-    app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
+    if os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true'):
+        # Debug mode's reloader imports everything twice; only use it when asked for
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            download_manager.start_scheduler()  # in the serving child only, so jobs fire once
+        # /health only answers once the debug server is up, so it may report ready from the start
+        startup.mark_ready()
+        app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
+    else:
+        download_manager.start_scheduler()
+        startup.serve(app, '0.0.0.0', 5000)
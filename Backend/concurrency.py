@@ -0,0 +1,222 @@
+"""
+Concurrency - Self-tuning (AIMD) limit on concurrently running spotdl processes
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Optional
+
+from fair_share import FairShare
+
+
+logger = logging.getLogger(__name__)
+
+ADJUST_INTERVAL = 10  # seconds per observation window
+ERROR_RATE_LIMIT = 0.2  # fraction of failed tracks in a window that counts as congestion
+CPU_LIMIT = 0.9  # load per core above which we back off
+DECREASE_FACTOR = 0.5
+
+
+def cpu_utilization() -> Optional[float]:
+    """Recent CPU load per core (0..1+), or None when it can't be measured"""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        pass
+    try:
+        import psutil  # optional, gives a reading on Windows
+    except ImportError:
+        return None
+    return psutil.cpu_percent(interval=None) / 100
+
+
+class AdaptiveLimiter:
+    """
+    Counting semaphore whose size follows additive-increase / multiplicative-decrease.
+
+    Every ADJUST_INTERVAL seconds the completion rate, track error rate, throttling
+    (HTTP 429) signals and CPU load of the window are compared: any sign of
+    congestion halves the limit, a saturated limit with healthy throughput grows it
+    by one, and an increase that made throughput worse is undone. An operator
+    override pins the limit and suspends the controller.
+
+    Free slots go to waiters in weighted fair-share order (see fair_share.FairShare),
+    not to whichever thread wakes up first.
+    """
+
+    def __init__(self, max_limit: int = 0, initial: int = 4, override: int = 0, interval: float = ADJUST_INTERVAL):
+        self.min_limit = 1
+        self.max_limit = max_limit or max(2, (os.cpu_count() or 2) * 2)
+        self.limit = max(self.min_limit, min(initial, self.max_limit))
+        self.override = override or None
+        self.interval = interval
+
+        self._cond = threading.Condition()
+        self.fair_share = FairShare()
+        self.active = 0
+        self.waiting = 0
+        self._completed = 0
+        self._errors = 0
+        self._throttled = 0
+        self._last_throughput: Optional[float] = None
+        self._last_action = 'hold'
+        self.decisions = deque(maxlen=50)
+
+        threading.Thread(target=self._control_loop, name='concurrency-controller', daemon=True).start()
+
+    @property
+    def effective_limit(self) -> int:
+        return self.override or self.limit
+
+    # ---------------------------- Slots ---------------------------- #
+    def acquire(
+        self,
+        should_abort: Callable[[], bool] | None = None,
+        task_id: str = '',
+        client: str | None = None,
+        priority: str | None = None,
+        cost: int = 1,
+    ) -> Optional[dict]:
+        """
+        Wait for a free slot for a unit of `cost` tracks. Returns the ticket to pass to
+        release(), or None if `should_abort` turns true first.
+        """
+        with self._cond:
+            ticket = self.fair_share.enqueue(task_id, client, priority, cost)
+            self.waiting += 1
+        try:
+            while True:
+                with self._cond:
+                    if self.fair_share.pick(self.active, self.effective_limit) is ticket:
+                        self.fair_share.grant(ticket)
+                        self.active += 1
+                        return ticket
+                # Called without _cond held: should_abort takes the caller's own locks, and
+                # those are held elsewhere while record_*() waits for _cond
+                if should_abort and should_abort():
+                    with self._cond:
+                        self.fair_share.discard(ticket)
+                        self._cond.notify_all()
+                    return None
+                with self._cond:
+                    if self.fair_share.pick(self.active, self.effective_limit) is not ticket:
+                        self._cond.wait(timeout=0.5)
+        finally:
+            with self._cond:
+                self.waiting -= 1
+
+    def release(self, ticket: dict | None = None):
+        with self._cond:
+            self.active = max(0, self.active - 1)
+            if ticket:
+                self.fair_share.done(ticket)
+            # Wake everyone: the next slot belongs to a specific waiter, not the first to wake
+            self._cond.notify_all()
+
+    # ---------------------------- Signals ---------------------------- #
+    def record_completion(self):
+        with self._cond:
+            self._completed += 1
+
+    def record_error(self):
+        with self._cond:
+            self._errors += 1
+
+    def record_throttle(self):
+        with self._cond:
+            self._throttled += 1
+
+    # ---------------------------- Control ---------------------------- #
+    def set_override(self, limit: int | None):
+        with self._cond:
+            self.override = max(self.min_limit, min(limit, self.max_limit)) if limit else None
+            self._cond.notify_all()
+        self._record('override' if limit else 'auto', 'set by operator', None, None, None)
+
+    def set_max_limit(self, max_limit: int):
+        with self._cond:
+            self.max_limit = max_limit or max(2, (os.cpu_count() or 2) * 2)
+            self.limit = min(self.limit, self.max_limit)
+
+    def _control_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.adjust()
+            except Exception as e:
+                logger.error(f"Concurrency controller error: {e}")
+
+    def adjust(self):
+        cpu = cpu_utilization()
+        with self._cond:
+            completed, errors, throttled = self._completed, self._errors, self._throttled
+            self._completed = self._errors = self._throttled = 0
+            throughput = completed / self.interval
+            error_rate = errors / (completed + errors) if completed + errors else 0.0
+            saturated = self.active >= self.limit or self.waiting > 0
+
+            if self.override:
+                action, reason = 'hold', 'operator override'
+            elif throttled:
+                action, reason = 'decrease', f'{throttled} throttling response(s)'
+            elif error_rate > ERROR_RATE_LIMIT:
+                action, reason = 'decrease', f'error rate {error_rate:.0%}'
+            elif cpu is not None and cpu > CPU_LIMIT:
+                action, reason = 'decrease', f'CPU load {cpu:.0%}'
+            elif (
+                self._last_action == 'increase'
+                and self._last_throughput
+                and throughput < self._last_throughput * 0.85
+            ):
+                action, reason = 'undo', 'throughput dropped after the last increase'
+            elif saturated and self.limit < self.max_limit:
+                action, reason = 'increase', 'all slots busy and no congestion'
+            else:
+                action, reason = 'hold', 'steady'
+
+            if action == 'decrease':
+                self.limit = max(self.min_limit, int(self.limit * DECREASE_FACTOR))
+            elif action == 'undo':
+                self.limit = max(self.min_limit, self.limit - 1)
+            elif action == 'increase':
+                self.limit += 1
+                self._cond.notify_all()
+
+            self._last_action = action
+            self._last_throughput = throughput
+
+        if action != 'hold' or not self.decisions or self.decisions[-1]['action'] != 'hold':
+            self._record(action, reason, throughput, error_rate, cpu)
+
+    def _record(self, action: str, reason: str, throughput, error_rate, cpu):
+        decision = {
+            'time': datetime.now().isoformat(),
+            'action': action,
+            'reason': reason,
+            'limit': self.effective_limit,
+            'throughput_tracks_per_s': round(throughput, 3) if throughput is not None else None,
+            'error_rate': round(error_rate, 3) if error_rate is not None else None,
+            'cpu': round(cpu, 3) if cpu is not None else None,
+        }
+        self.decisions.append(decision)
+        if action != 'hold':
+            logger.info(f"Concurrency {action} -> {decision['limit']} ({reason})")
+
+    def status(self) -> dict:
+        with self._cond:
+            return {
+                'limit': self.effective_limit,
+                'adaptive_limit': self.limit,
+                'override': self.override,
+                'min_limit': self.min_limit,
+                'max_limit': self.max_limit,
+                'active': self.active,
+                'waiting': self.waiting,
+                'fair_share': self.fair_share.status(),
+                'decisions': list(self.decisions),
+            }
@@ -0,0 +1,312 @@
+"""
+Config Store - Validated, atomically persisted configuration with write-behind
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+AUDIO_FORMATS = ('mp3', 'flac', 'ogg', 'opus', 'm4a', 'wav', 'native')
+# Formats the source stream already comes in: spotdl only moves/remuxes them when re-encoding is disabled
+PASSTHROUGH_FORMATS = ('opus', 'm4a')
+# 'native' keeps YouTube's Opus stream as-is, remuxed from WebM into an .opus container
+NATIVE_FORMAT = 'opus'
+AUDIO_QUALITIES = ('128k', '192k', '256k', '320k')
+# 'HH:MM-HH:MM' local-time windows (may wrap midnight), comma separated
+_WINDOW = r'(?:[01]?\d|2[0-4]):[0-5]\d-(?:[01]?\d|2[0-4]):[0-5]\d'
+_RATE = r'\d+(?:\.\d+)?[kKmM]?'
+TIME_WINDOWS_PATTERN = rf'(?:{_WINDOW}(?:\s*,\s*{_WINDOW})*)?'
+BANDWIDTH_SCHEDULE_PATTERN = rf'(?:{_WINDOW}={_RATE}(?:\s*,\s*{_WINDOW}={_RATE})*)?'
+
+# field -> {'type', 'default', optional 'choices' / 'min' / 'max' / 'pattern'}
+CONFIG_SCHEMA: Dict[str, dict] = {
+    'client_id': {'type': str, 'default': ''},
+    'client_secret': {'type': str, 'default': ''},
+    'redirect_uri': {'type': str, 'default': 'http://localhost:8888/callback'},
+    'default_download_path': {'type': str, 'default': str(Path.home() / 'Downloads' / 'GroveGrab')},
+    'audio_format': {'type': str, 'default': 'mp3', 'choices': AUDIO_FORMATS},
+    'audio_quality': {'type': str, 'default': '320k', 'choices': AUDIO_QUALITIES},
+    'has_credentials': {'type': bool, 'default': False},
+    # Parallel (sharded) downloads of large playlists/albums/artists
+    'parallel_downloads': {'type': bool, 'default': False},
+    'shard_size': {'type': int, 'default': 50, 'min': 1, 'max': 500},
+    'shard_workers': {'type': int, 'default': 4, 'min': 1, 'max': 32},
+    'download_threads': {'type': int, 'default': 0, 'min': 0, 'max': 32},  # 0 = spotdl default
+    # Retention: finished tasks beyond these limits move from memory to the archive
+    'max_live_tasks': {'type': int, 'default': 200, 'min': 1},
+    'task_max_age_hours': {'type': int, 'default': 24, 'min': 0},  # 0 = no age limit
+    # 'queue' hands downloads to worker processes (worker.py) through a shared SQLite queue
+    'execution_mode': {'type': str, 'default': 'local', 'choices': ('local', 'queue')},
+    'queue_path': {'type': str, 'default': ''},  # '' = <data dir>/jobs.db
+    # Concurrent spotdl processes: adaptive between 1 and concurrency_max unless pinned
+    'concurrency_limit': {'type': int, 'default': 0, 'min': 0},  # 0 = adaptive
+    'concurrency_max': {'type': int, 'default': 0, 'min': 0},  # 0 = 2 x CPU count
+    # Shared album-art/lyrics cache for tasks with resolved track lists (sharded downloads, syncs)
+    'media_cache': {'type': bool, 'default': True},
+    'media_cache_mb': {'type': int, 'default': 512, 'min': 1},
+    # Admission control: tasks wait until their disk has room for them and a free writer slot
+    'admission_control': {'type': bool, 'default': True},
+    'min_free_mb': {'type': int, 'default': 1024, 'min': 0},
+    'max_writers_per_device': {'type': int, 'default': 4, 'min': 0},  # 0 = unlimited
+    # Check finished tracks (duration, tags, ffmpeg decode of the tail), re-download broken ones, write manifests
+    'verify_downloads': {'type': bool, 'default': True},
+    'verify_decode': {'type': bool, 'default': True},
+    'journal_days': {'type': int, 'default': 30, 'min': 0},  # days of events kept for /api/stats; 0 = forever
+    # Scheduled jobs marked off-peak only start inside these windows ('' = any time), e.g. '01:00-07:00'
+    'offpeak_windows': {'type': str, 'default': '', 'pattern': TIME_WINDOWS_PATTERN},
+    # Total download rate by time of day, e.g. '08:00-23:00=2M, 23:00-08:00=0' (0 = unlimited)
+    'bandwidth_schedule': {'type': str, 'default': '', 'pattern': BANDWIDTH_SCHEDULE_PATTERN},
+}
+
+# Settings beyond the basic credentials/format ones that the API may read and update
+TUNABLE_SETTINGS = (
+    'parallel_downloads', 'shard_size', 'shard_workers', 'download_threads',
+    'max_live_tasks', 'task_max_age_hours', 'concurrency_limit', 'concurrency_max',
+    'media_cache', 'media_cache_mb', 'admission_control', 'min_free_mb', 'max_writers_per_device',
+    'verify_downloads', 'verify_decode', 'journal_days', 'offpeak_windows', 'bandwidth_schedule',
+)
+
+
+class ConfigError(ValueError):
+    """Raised when a configuration value does not match the schema"""
+
+
+def get_data_dir() -> Path:
+    """Directory for config.json, logs and other runtime state (independent of the cwd)"""
+    override = os.environ.get('GROVEGRAB_DATA_DIR')
+    if override:
+        base = Path(override)
+    elif getattr(sys, 'frozen', False):
+        base = Path(sys.executable).resolve().parent
+    else:
+        base = Path(__file__).resolve().parent
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+def atomic_write_json(path: Path, data: Any, indent: Optional[int] = 2):
+    """Write JSON to a temp file in the same directory, fsync it, then rename over `path`"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def validate_value(key: str, value: Any) -> Any:
+    field = CONFIG_SCHEMA.get(key)
+    if field is None:
+        raise ConfigError(f"Unknown config key: {key}")
+    expected = field['type']
+    if expected is int and isinstance(value, str) and value.strip().lstrip('-').isdigit():
+        value = int(value)
+    if expected is bool and not isinstance(value, bool):
+        raise ConfigError(f"{key} must be a boolean")
+    if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+        raise ConfigError(f"{key} must be of type {expected.__name__}")
+    if 'choices' in field and value not in field['choices']:
+        raise ConfigError(f"{key} must be one of: {', '.join(map(str, field['choices']))}")
+    if 'min' in field and value < field['min']:
+        raise ConfigError(f"{key} must be at least {field['min']}")
+    if 'max' in field and value > field['max']:
+        raise ConfigError(f"{key} must be at most {field['max']}")
+    if 'pattern' in field:
+        value = value.strip()
+        if not re.fullmatch(field['pattern'], value):
+            raise ConfigError(f"{key} has an invalid format: {value!r}")
+    return value
+
+
+def default_config() -> dict:
+    return {key: field['default'] for key, field in CONFIG_SCHEMA.items()}
+
+
+def normalize_config(raw: dict) -> dict:
+    """Merge `raw` over the defaults, dropping unknown keys and invalid values"""
+    config = default_config()
+    for key, value in (raw or {}).items():
+        if key not in CONFIG_SCHEMA:
+            continue
+        try:
+            config[key] = validate_value(key, value)
+        except ConfigError as e:
+            logger.warning(f"Ignoring invalid config value: {e}")
+    config['has_credentials'] = bool(config.get('client_id') and config.get('client_secret'))
+    return config
+
+
+class ConfigStore:
+    """
+    In-memory config backed by a JSON file.
+
+    Reads are served from memory. Updates are applied in memory immediately and
+    written behind after `write_delay` seconds (coalescing bursts of updates) using
+    an atomic temp-file-plus-rename. External edits to the file are picked up by a
+    polling watcher so the running server hot-reloads them.
+    """
+
+    def __init__(self, path: Path, write_delay: float = 0.5, watch_interval: float = 2.0):
+        self.path = Path(path)
+        self.write_delay = write_delay
+        self.watch_interval = watch_interval
+
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        self._dirty = False
+        self._last_mtime: Optional[float] = None
+        self._stop = threading.Event()
+        self._listeners: List[Callable[[dict], None]] = []
+
+        self._config = self._load()
+        atexit.register(self.close)
+
+        if watch_interval > 0:
+            self._watcher = threading.Thread(target=self._watch, name='config-watcher', daemon=True)
+            self._watcher.start()
+
+    # ---------------------------- Load / Save ---------------------------- #
+    def _read_file(self) -> Optional[dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ConfigError('config root must be an object')
+            return data
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Failed to load config: {e}")
+            return None
+
+    def _load(self) -> dict:
+        raw = self._read_file()
+        if raw is None and self.path.exists():
+            self._backup_unreadable()
+        config = normalize_config(raw or {})
+        if raw is None or raw != config:
+            # First run, corrupt file or schema upgrade: persist the normalized version
+            self._write(config)
+        else:
+            self._last_mtime = self._mtime()
+        return config
+
+    def _backup_unreadable(self):
+        """Keep an unparseable config.json as config.json.bak before defaults replace it"""
+        backup = self.path.with_name(self.path.name + '.bak')
+        try:
+            os.replace(self.path, backup)
+            logger.warning(f"Moved unreadable config to {backup}")
+        except OSError as e:
+            logger.error(f"Could not back up unreadable config: {e}")
+
+    def _mtime(self) -> Optional[float]:
+        try:
+            return self.path.stat().st_mtime
+        except OSError:
+            return None
+
+    def _write(self, config: dict):
+        try:
+            atomic_write_json(self.path, config)
+            self._last_mtime = self._mtime()
+        except Exception as e:
+            logger.error(f"Failed to save config: {e}")
+
+    def flush(self):
+        """Write pending changes now"""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            config = dict(self._config)
+            self._write(config)
+
+    def _schedule_flush(self):
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.write_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    # ---------------------------- Access ---------------------------- #
+    def snapshot(self) -> dict:
+        """Immutable-by-convention copy of the current config (values are scalars)"""
+        with self._lock:
+            return dict(self._config)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._config.get(key, default)
+
+    def update(self, changes: Dict[str, Any]) -> dict:
+        """Validate and apply `changes` atomically in memory, then schedule a write-behind"""
+        validated = {key: validate_value(key, value) for key, value in changes.items() if value is not None}
+        with self._lock:
+            self._config.update(validated)
+            self._config['has_credentials'] = bool(
+                self._config.get('client_id') and self._config.get('client_secret')
+            )
+            self._dirty = True
+            self._schedule_flush()
+            config = dict(self._config)
+        self._notify(config)
+        return config
+
+    def add_listener(self, callback: Callable[[dict], None]):
+        """Call `callback(config)` after every update or hot reload"""
+        self._listeners.append(callback)
+
+    def _notify(self, config: dict):
+        for callback in list(self._listeners):
+            try:
+                callback(dict(config))
+            except Exception as e:
+                logger.error(f"Config listener failed: {e}")
+
+    # ---------------------------- Hot reload ---------------------------- #
+    def _watch(self):
+        while not self._stop.wait(self.watch_interval):
+            mtime = self._mtime()
+            if mtime is None or mtime == self._last_mtime:
+                continue
+            with self._lock:
+                if self._dirty:
+                    # Our own pending write wins over an external edit
+                    continue
+                raw = self._read_file()
+                self._last_mtime = mtime
+                if raw is None:
+                    continue
+                self._config = normalize_config(raw)
+                config = dict(self._config)
+            logger.info(f"Reloaded config from {self.path}")
+            self._notify(config)
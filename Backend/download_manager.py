@@ -5,17 +5,45 @@ from __future__ import annotations
 
 import json
 import logging
+import os
 import re
 import subprocess
 import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from threading import Lock
-from typing import List, Optional
-
+from typing import TYPE_CHECKING, List, Optional
+
+from admission import DEFAULT_TRACK_COUNTS, AdmissionController, estimate_bytes
+from concurrency import AdaptiveLimiter
+from config_store import NATIVE_FORMAT, PASSTHROUGH_FORMATS, ConfigError, ConfigStore, get_data_dir
+from fair_share import BULK_UNIT_COST, DEFAULT_PRIORITY
+from job_queue import JobQueue
+from journal import EventJournal, error_class, source_host
+from manifest import LibraryManifest
+from media_cache import TAGGABLE_FORMATS, MediaCache
+from process_tree import cleanup_partial_files, kill_tree, popen_kwargs
+from scheduler import ScheduleError, Scheduler, bandwidth_cap
+from sync_store import SyncStore
+from task_archive import TaskArchive
+from verifier import Verifier
+
+if TYPE_CHECKING:
+    from spotify_api import SpotifyClient
 
 logger = logging.getLogger(__name__)
 
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+STOPPABLE_STATUSES = ('queued', 'running', 'pausing', 'paused')
+RETENTION_INTERVAL = 60  # seconds between background retention sweeps
+
+# URL types that resolve to many tracks and can be split into shards
+SHARDABLE_TYPES = ('playlist', 'album', 'artist')
+SPOTDL_DEFAULT_THREADS = 4  # concurrent downloads inside one spotdl process when download_threads is 0
+
 
 def check_internet_connection():
     """Check if internet connection is available"""
@@ -27,48 +55,97 @@ def check_internet_connection():
         return False
 
 
+def song_display_name(song: dict) -> str:
+    """Title as spotdl prints it in its log lines ("Artist - Name")"""
+    artist = song.get('artist') or next(iter(song.get('artists') or []), '')
+    return f"{artist} - {song.get('name', '')}"
+
+
+def expected_file_path(song: dict, download_path: str, file_extension: str) -> Optional[str]:
+    """Where spotdl writes `song` for `--output download_path`, using spotdl's own formatter"""
+    try:
+        from dataclasses import fields
+
+        from spotdl.types.song import Song
+        from spotdl.utils.formatter import create_file_name
+    except ImportError:
+        return None
+    try:
+        template = str(Path(download_path) / '{artists} - {title}.{output-ext}')
+        # The name only depends on title and artists; songs listed through the Web API lack the rest
+        data = {f.name: None for f in fields(Song)}
+        data.update(song)
+        return str(create_file_name(Song.from_dict(data), template, file_extension))
+    except Exception as e:
+        logger.debug(f"Could not compute file name for {song.get('url')}: {e}")
+        return None
+
+
+def unit_cost(cmd: List[str]) -> int:
+    """Tracks a spotdl invocation works on, for fair-share scheduling"""
+    urls = [arg for arg in cmd if 'spotify.com/' in arg]
+    if len(urls) == 1 and '/track/' not in urls[0]:
+        return BULK_UNIT_COST
+    return max(1, len(urls))
+
+
+def resolve_queue_path(config: dict) -> Path:
+    return Path(config['queue_path']) if config.get('queue_path') else get_data_dir() / 'jobs.db'
+
+
 class DownloadManager:
-    def __init__(self):
+    def __init__(self, use_queue: bool | None = None, retention: bool = True):
+        """
+        `use_queue` forces queue (coordinator) or local execution; None follows `execution_mode`.
+        `retention` off keeps finished tasks in memory until deleted (workers: the coordinator archives).
+        """
+        self.retention = retention
         self.tasks = {}  # task_id -> task_data (JSON-serializable)
-        self.tasks_lock = Lock()
-        self.processes = {}  # task_id -> subprocess.Popen
-
-        self.config_file = Path('config.json')
-        self.logs_dir = Path('logs')
+        self.tasks_lock = threading.Lock()
+        self.processes = {}  # task_id -> [subprocess.Popen] (several when sharded)
+        self.task_configs = {}  # task_id -> config snapshot taken at task start
+        self.task_access = {}  # task_id -> monotonic time of last single-task read (LRU order)
+        self.task_songs = {}  # task_id -> {url: spotdl song dict} for tasks with resolved track lists
+
+        data_dir = get_data_dir()
+        self.config_store = ConfigStore(data_dir / 'config.json')
+        self.archive = TaskArchive(data_dir / 'tasks.db')
+        self.sync_store = SyncStore(data_dir / 'sync')
+        self._spotify = None  # SpotifyClient for the current credentials
+        self.logs_dir = data_dir / 'logs'
         self.logs_dir.mkdir(exist_ok=True)
 
-        self.config = self._load_config()
+        config = self.config_store.snapshot()
+        if use_queue is None:
+            use_queue = config.get('execution_mode') == 'queue'
+        self.job_queue = JobQueue(resolve_queue_path(config)) if use_queue else None
 
-    # ---------------------------- Config ---------------------------- #
-    def _load_config(self) -> dict:
-        if self.config_file.exists():
-            try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Failed to load config: {e}")
-
-        default_config = {
-            'client_id': '',
-            'client_secret': '',
-            'redirect_uri': 'http://localhost:8888/callback',
-            'default_download_path': str(Path.home() / 'Downloads' / 'GroveGrab'),
-            'audio_format': 'mp3',
-            'audio_quality': '320k',
-            'has_credentials': False,
-        }
-        self._save_config(default_config)
-        return default_config
+        self.concurrency = AdaptiveLimiter(
+            max_limit=config.get('concurrency_max', 0), override=config.get('concurrency_limit', 0)
+        )
+        self.journal = EventJournal(data_dir / 'journal', config.get('journal_days', 30))
+        self.verifier = Verifier()
+        self.media_cache = MediaCache(data_dir / 'media_cache', config.get('media_cache_mb', 512) * 1024 * 1024)
+        self.admission = AdmissionController(
+            self._remaining_fraction,
+            min_free_bytes=config.get('min_free_mb', 1024) * 1024 * 1024,
+            max_writers=config.get('max_writers_per_device', 4),
+        )
+        self.scheduler = Scheduler(
+            data_dir / 'schedules.json', self._launch_scheduled, self._is_task_active, self.config_store.snapshot
+        )
+        self.config_store.add_listener(self._apply_config)
 
-    def _save_config(self, config: dict):
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2)
-        except Exception as e:
-            logger.error(f"Failed to save config: {e}")
+        if retention:
+            threading.Thread(target=self._retention_loop, name='task-retention', daemon=True).start()
+
+    # ---------------------------- Config ---------------------------- #
+    @property
+    def config(self) -> dict:
+        return self.config_store.snapshot()
 
     def get_config(self) -> dict:
-        return self.config.copy()
+        return self.config_store.snapshot()
 
     def update_config(
         self,
@@ -78,31 +155,72 @@ class DownloadManager:
         download_path: str | None = None,
         audio_format: str | None = None,
         audio_quality: str | None = None,
+        **settings,
     ) -> bool:
+        """Apply config changes; raises ConfigError for values that fail validation"""
         try:
-            if client_id is not None:
-                self.config['client_id'] = client_id
-            if client_secret is not None:
-                self.config['client_secret'] = client_secret
-            if redirect_uri is not None:
-                self.config['redirect_uri'] = redirect_uri
-            if download_path is not None:
-                self.config['default_download_path'] = download_path
-            if audio_format is not None:
-                self.config['audio_format'] = audio_format
-            if audio_quality is not None:
-                self.config['audio_quality'] = audio_quality
-
-            self.config['has_credentials'] = bool(
-                self.config.get('client_id') and self.config.get('client_secret')
-            )
-
-            self._save_config(self.config)
+            self.config_store.update({
+                'client_id': client_id,
+                'client_secret': client_secret,
+                'redirect_uri': redirect_uri,
+                'default_download_path': download_path,
+                'audio_format': audio_format,
+                'audio_quality': audio_quality,
+                **settings,
+            })
             return True
+        except ConfigError:
+            raise
         except Exception as e:
             logger.error(f"Failed to update config: {e}")
             return False
 
+    def _apply_config(self, config: dict):
+        """Push runtime-tunable settings into running subsystems"""
+        self.concurrency.set_max_limit(config.get('concurrency_max', 0))
+        override = config.get('concurrency_limit', 0) or None
+        if override != self.concurrency.override:
+            self.concurrency.set_override(override)
+        max_bytes = config.get('media_cache_mb', 512) * 1024 * 1024
+        if max_bytes != self.media_cache.max_bytes:
+            self.media_cache.set_max_bytes(max_bytes)
+        self.admission.configure(config.get('min_free_mb', 1024) * 1024 * 1024, config.get('max_writers_per_device', 4))
+        self.journal.retention_days = config.get('journal_days', 30)
+
+    def get_concurrency(self) -> dict:
+        return self.concurrency.status()
+
+    def get_media_cache(self) -> dict:
+        return self.media_cache.stats()
+
+    def get_admission(self) -> dict:
+        return self.admission.status()
+
+    def get_stats(self, hours: float = 24, bucket_minutes: int = 60, top: int = 10) -> dict:
+        return self.journal.stats(hours, bucket_minutes, top)
+
+    def set_concurrency_override(self, limit: int | None) -> dict:
+        """Pin the number of concurrent spotdl processes (None/0 hands control back to the controller)"""
+        self.config_store.update({'concurrency_limit': limit or 0})
+        return self.concurrency.status()
+
+    def _spotify_client(self, config: dict) -> Optional[SpotifyClient]:
+        if not config.get('has_credentials'):
+            return None
+        from spotify_api import SpotifyClient  # urllib.request is slow to import; only load it when used
+
+        client = self._spotify
+        if not client or (client.client_id, client.client_secret) != (config['client_id'], config['client_secret']):
+            client = self._spotify = SpotifyClient(config['client_id'], config['client_secret'])
+        return client
+
+    def _snapshot_config(self, task_id: str, config: dict | None = None) -> dict:
+        """Freeze the config a task runs with so mid-run updates don't affect it"""
+        snapshot = dict(config) if config is not None else self.config_store.snapshot()
+        with self.tasks_lock:
+            self.task_configs[task_id] = snapshot
+        return snapshot
+
     # ---------------------------- Validation ---------------------------- #
     def validate_url(self, url: str) -> dict:
         patterns = {
@@ -122,6 +240,7 @@ class DownloadManager:
 
     # ---------------------------- Tasks ---------------------------- #
     def preload_metadata(self, task_id: str, url: str):
+        config = self._snapshot_config(task_id)
         with self.tasks_lock:
             self.tasks[task_id] = {
                 'id': task_id,
@@ -141,8 +260,13 @@ class DownloadManager:
 
         try:
             self._log(task_id, f"Starting metadata preload for: {url}")
-            cmd = self._build_spotdl_command(url, preload_only=True)
-            result = self._execute_spotdl(task_id, cmd)
+            info = self.validate_url(url)
+            client = self._spotify_client(config)
+            if client and info.get('type') in SHARDABLE_TYPES:
+                result = self._stream_preload(task_id, client, info)
+            else:
+                cmd = self._build_spotdl_command(url, config, preload_only=True)
+                result = self._execute_spotdl(task_id, cmd)
 
             with self.tasks_lock:
                 if result['success']:
@@ -158,12 +282,34 @@ class DownloadManager:
             )
         except Exception as e:
             logger.error(f"Preload error for task {task_id}: {e}")
-            with self.tasks_lock:
-                self.tasks[task_id]['status'] = 'failed'
-                self.tasks[task_id]['updated_at'] = datetime.now().isoformat()
+            self._mark_failed(task_id)
             self._log(task_id, f"Error: {str(e)}")
+        self.enforce_retention()
+
+    def start_download(
+        self,
+        task_id: str,
+        url: str,
+        download_path: str | None = None,
+        parallel: bool | None = None,
+        config: dict | None = None,
+        priority: str = DEFAULT_PRIORITY,
+        client: str | None = None,
+    ):
+        """
+        Run a download here, or queue it for a worker in queue mode. `config` pins the config
+        snapshot; `priority` and `client` decide its share of the spotdl slots.
+        """
+        config = self._snapshot_config(task_id, config)
+        if parallel is None:
+            parallel = config.get('parallel_downloads', False)
+        scheduling = {'priority': priority, 'client': client}
+        self.journal.record('submitted', task_id, kind=self.validate_url(url).get('type'), **scheduling)
+
+        if self.job_queue:
+            self._enqueue(task_id, 'download', url, download_path, config, parallel=bool(parallel), **scheduling)
+            return
 
-    def start_download(self, task_id: str, url: str, download_path: str | None = None):
         # Check internet connection first
         if not check_internet_connection():
             with self.tasks_lock:
@@ -178,7 +324,7 @@ class DownloadManager:
                     'failed_tracks': 0,
                     'current_track': '',
                     'tracks': [],
-                    'download_path': download_path or self.config.get('default_download_path'),
+                    'download_path': download_path or config.get('default_download_path'),
                     'logs': ['❌ No internet connection detected. Please check your network and try again.'],
                     'failed_track_list': [],
                     'created_at': datetime.now().isoformat(),
@@ -189,88 +335,854 @@ class DownloadManager:
             return
 
         if not download_path:
-            download_path = self.config.get('default_download_path')
+            download_path = config.get('default_download_path')
         Path(download_path).mkdir(parents=True, exist_ok=True)
 
         with self.tasks_lock:
-            self.tasks[task_id] = {
-                'id': task_id,
-                'url': url,
-                'type': 'download',
-                'status': 'running',
-                'progress': 0,
-                'total_tracks': 0,
-                'completed_tracks': 0,
-                'failed_tracks': 0,
-                'current_track': '',
-                'tracks': [],  # [{ title, status, progress }]
-                'download_path': download_path,
-                'logs': [],
-                'failed_track_list': [],
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat(),
-                'cancelled': False,
-            }
+            self.tasks[task_id] = self._new_task(
+                task_id, url, 'download', download_path, parallel=bool(parallel), **scheduling
+            )
 
         try:
             self._log(task_id, f"Starting download for: {url}")
             self._log(task_id, f"Download path: {download_path}")
+            result = self._run_download(task_id, url, download_path, config, parallel)
+            self._finish_task(task_id, result)
+        except Exception as e:
+            logger.error(f"Download error for task {task_id}: {e}")
+            self.admission.release(task_id)
+            self._mark_failed(task_id)
+            self._log(task_id, f"Error: {str(e)}")
+        self.enforce_retention()
+
+    def _run_download(self, task_id: str, url: str, download_path: str, config: dict, parallel: bool) -> dict:
+        info = self.validate_url(url)
+        if info.get('type') == 'artist':
+            client = self._spotify_client(config)
+            if client:
+                return self._run_streaming(task_id, client, info, download_path, config)
+        if parallel and info.get('type') in SHARDABLE_TYPES:
+            return self._run_sharded(task_id, url, download_path, config)
+        admission = self._admit(task_id, download_path, self._estimate_url(url, config), config)
+        if not admission['admitted']:
+            return {'success': False, 'error': admission['error']}
+        cmd = self._build_spotdl_command(url, config, download_path=download_path)
+        return self._execute_spotdl(task_id, cmd)
+
+    def _new_task(self, task_id: str, url: str, task_type: str, download_path: str, **extra) -> dict:
+        now = datetime.now().isoformat()
+        return {
+            'id': task_id,
+            'url': url,
+            'type': task_type,
+            'status': 'running',
+            'progress': 0,
+            'total_tracks': 0,
+            'completed_tracks': 0,
+            'failed_tracks': 0,
+            'current_track': '',
+            'tracks': [],  # [{ title, status, progress }]
+            'download_path': download_path,
+            'logs': [],
+            'failed_track_list': [],
+            'created_at': now,
+            'updated_at': now,
+            'cancelled': False,
+            **extra,
+        }
 
-            cmd = self._build_spotdl_command(url, download_path=download_path)
-            result = self._execute_spotdl(task_id, cmd)
+    def _finish_task(self, task_id: str, result: dict, noun: str = 'Download'):
+        # Give back the disk reservation before the status is published: once a task reads
+        # 'paused' a resume may admit it again, and that reservation must not be released here
+        self.admission.release(task_id)
+        # Decide final status without logging under the lock
+        with self.tasks_lock:
+            task = self.tasks.get(task_id)
+            if not task:
+                return  # deleted while it ran
+            if task.get('cancelled'):
+                task['status'] = 'cancelled'
+                final_msg = f'{noun} cancelled by user'
+            elif task.get('paused'):
+                task['status'] = 'paused'
+                final_msg = f'{noun} paused'
+            elif result['success']:
+                task['status'] = 'completed'
+                task['progress'] = 100
+                final_msg = f'{noun} completed successfully!'
+            else:
+                task['status'] = 'failed'
+                final_msg = f"{noun} failed: {result.get('error', 'Unknown error')}"
+            task['updated_at'] = datetime.now().isoformat()
+            status = task['status']
+            created = datetime.fromisoformat(task['created_at'])
+
+        self.journal.record(
+            'task_finished',
+            task_id,
+            kind=status,
+            ms=int((datetime.now() - created).total_seconds() * 1000),
+            err=error_class(result.get('error')) if status == 'failed' else None,
+        )
+        self._log(task_id, final_msg)
 
-            # Decide final status without logging under the lock
-            with self.tasks_lock:
-                if self.tasks[task_id].get('cancelled'):
-                    self.tasks[task_id]['status'] = 'cancelled'
-                    final_msg = 'Download cancelled by user'
-                elif result['success']:
-                    self.tasks[task_id]['status'] = 'completed'
-                    self.tasks[task_id]['progress'] = 100
-                    final_msg = 'Download completed successfully!'
+    def _mark_failed(self, task_id: str):
+        with self.tasks_lock:
+            task = self.tasks.get(task_id)
+            if task:  # a task deleted while it ran has nothing left to mark
+                task['status'] = 'failed'
+                task['updated_at'] = datetime.now().isoformat()
+
+    # ---------------------------- Job queue ---------------------------- #
+    def _enqueue(self, task_id: str, kind: str, url: str, download_path: str | None, config: dict, **options):
+        download_path = download_path or config.get('default_download_path')
+        task = self._new_task(task_id, url, kind, download_path, **options)
+        task['status'] = 'queued'
+        task['logs'].append(f"[{datetime.now().strftime('%H:%M:%S')}] Queued for a worker")
+        payload = {'url': url, 'download_path': download_path, 'options': options, 'config': config}
+        self.job_queue.enqueue(task_id, kind, payload, task, priority=options.get('priority', DEFAULT_PRIORITY))
+        with self.tasks_lock:
+            self.task_configs.pop(task_id, None)
+        logger.info(f"Task {task_id}: queued {kind} job")
+
+    def run_job(self, job: dict):
+        """Execute a job leased from the queue (worker side)"""
+        payload = job['payload']
+        options = payload.get('options', {})
+        if job['kind'] == 'sync':
+            self.start_sync(
+                job['id'], payload['url'], payload.get('download_path'),
+                options.get('prune', False), config=payload.get('config'),
+                priority=options.get('priority', DEFAULT_PRIORITY), client=options.get('client'),
+            )
+        else:
+            self.start_download(
+                job['id'], payload['url'], payload.get('download_path'),
+                options.get('parallel'), config=payload.get('config'),
+                priority=options.get('priority', DEFAULT_PRIORITY), client=options.get('client'),
+            )
+
+    def export_task(self, task_id: str) -> Optional[dict]:
+        """Deep copy of a live task, safe to serialize while the task keeps running"""
+        with self.tasks_lock:
+            task = self.tasks.get(task_id)
+            return json.loads(json.dumps(task)) if task else None
+
+    def get_workers(self) -> List[dict]:
+        return self.job_queue.workers() if self.job_queue else []
+
+    # ---------------------------- Sync ---------------------------- #
+    def start_sync(
+        self,
+        task_id: str,
+        url: str,
+        download_path: str | None = None,
+        prune: bool = False,
+        config: dict | None = None,
+        priority: str = DEFAULT_PRIORITY,
+        client: str | None = None,
+    ):
+        """Download only the tracks added to a playlist since its last sync (optionally deleting removed ones)"""
+        config = self._snapshot_config(task_id, config)
+        scheduling = {'priority': priority, 'client': client}
+        self.journal.record('submitted', task_id, kind='sync', **scheduling)
+        if self.job_queue:
+            self._enqueue(task_id, 'sync', url, download_path, config, prune=bool(prune), **scheduling)
+            return
+
+        download_path = download_path or config.get('default_download_path')
+
+        with self.tasks_lock:
+            self.tasks[task_id] = self._new_task(task_id, url, 'sync', download_path, prune=bool(prune), **scheduling)
+
+        try:
+            info = self.validate_url(url)
+            if info.get('type') != 'playlist':
+                self._finish_task(task_id, {'success': False, 'error': 'Sync only supports playlist URLs'}, 'Sync')
+                return
+            if not check_internet_connection():
+                self._log(task_id, '❌ No internet connection detected. Please check your network and try again.')
+                self._finish_task(task_id, {'success': False, 'error': 'No internet connection'}, 'Sync')
+                return
+
+            Path(download_path).mkdir(parents=True, exist_ok=True)
+            result = self._run_sync(task_id, info['id'], url, download_path, prune, config)
+            self._finish_task(task_id, result, 'Sync')
+        except Exception as e:
+            logger.error(f"Sync error for task {task_id}: {e}")
+            self.admission.release(task_id)
+            self._mark_failed(task_id)
+            self._log(task_id, f"Error: {str(e)}")
+        self.enforce_retention()
+
+    def _run_sync(
+        self, task_id: str, playlist_id: str, url: str, download_path: str, prune: bool, config: dict
+    ) -> dict:
+        stored = self.sync_store.load(playlist_id)
+        if stored and stored.get('download_path') != download_path:
+            self._log(task_id, 'Download path changed since the last sync; doing a full sync')
+            stored = None
+        known = (stored or {}).get('tracks', {})
+
+        # Cheap check first: an unchanged snapshot_id means nothing to do
+        from spotify_api import SpotifyAPIError
+
+        snapshot_id = None
+        client = self._spotify_client(config)
+        if client:
+            try:
+                snapshot_id = client.get_playlist_snapshot(playlist_id)
+            except SpotifyAPIError as e:
+                self._log(task_id, f"Could not fetch playlist snapshot ({e}); comparing track lists instead")
+        if stored and snapshot_id and stored.get('snapshot_id') == snapshot_id:
+            self._log(task_id, 'Playlist unchanged since last sync')
+            return {'success': True}
+
+        songs = self._resolve_tracks(task_id, url, config)
+        if songs is None:
+            return {'success': False, 'error': 'Could not resolve track list'}
+
+        current = {s.get('song_id') or s['url']: s for s in songs}
+        added = [s for sid, s in current.items() if sid not in known]
+        removed = [sid for sid in known if sid not in current]
+        self._log(task_id, f"Sync diff: {len(added)} added, {len(removed)} removed, {len(current) - len(added)} unchanged")
+        with self.tasks_lock:
+            if task_id in self.tasks:
+                self.tasks[task_id]['total_tracks'] = len(added)
+
+        result = {'success': True}
+        if added:
+            result = self._download_songs(task_id, added, download_path, config)
+
+        # A paused sync still records what it finished, so resuming only diffs the rest
+
+        with self.tasks_lock:
+            task = self.tasks.get(task_id) or {}
+            if task.get('cancelled'):
+                return {'success': False, 'error': 'Cancelled by user'}
+            done = {t.get('id') or t.get('url') for t in task.get('tracks', []) if t.get('status') == 'completed'}
+
+        if prune and removed:
+            pruned = 0
+            for sid in removed:
+                pruned += self._delete_track_file(known[sid].get('file'))
+            self._log(task_id, f"Pruned {pruned} file(s) of {len(removed)} removed track(s)")
+
+        audio_format = config.get('audio_format', 'mp3')
+        ext = NATIVE_FORMAT if audio_format == 'native' else audio_format
+        tracks = {sid: entry for sid, entry in known.items() if sid in current}
+        for s in added:
+            sid = s.get('song_id') or s['url']
+            if sid in done:
+                tracks[sid] = {
+                    'url': s['url'],
+                    'title': song_display_name(s),
+                    'file': expected_file_path(s, download_path, ext),
+                }
+
+        # Only remember the snapshot_id when everything landed, so failed tracks are retried next time
+        self.sync_store.save(playlist_id, {
+            'playlist_id': playlist_id,
+            'url': url,
+            'download_path': download_path,
+            'snapshot_id': snapshot_id if len(tracks) == len(current) else None,
+            'synced_at': datetime.now().isoformat(),
+            'tracks': tracks,
+        })
+        return result
+
+    def _delete_track_file(self, file_path: str | None) -> int:
+        if not file_path:
+            return 0
+        deleted = 0
+        path = Path(file_path)
+        for candidate in (path, path.with_suffix('.lrc')):
+            try:
+                candidate.unlink()
+                deleted += candidate == path
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not delete {candidate}: {e}")
+        return deleted
+
+    def get_sync_snapshots(self) -> List[dict]:
+        return self.sync_store.list()
+
+    # ---------------------------- Streaming expansion ---------------------------- #
+    def _add_tracks(self, task_id: str, songs: List[dict], status: str = 'queued') -> List[dict]:
+        """Append newly listed songs to the task's track list; returns the ones it didn't have yet"""
+        with self.tasks_lock:
+            task = self.tasks.get(task_id)
+            if not task:
+                return []
+            known = {t.get('id') for t in task['tracks']}
+            added = [s for s in songs if s['song_id'] not in known]
+            task['tracks'].extend(
+                {
+                    'title': song_display_name(s),
+                    'status': status,
+                    'progress': 100 if status == 'resolved' else 0,
+                    'id': s['song_id'],
+                    'url': s['url'],
+                }
+                for s in added
+            )
+            task['total_tracks'] = len(task['tracks'])
+            task['updated_at'] = datetime.now().isoformat()
+        self._journal_resolved(task_id, added)
+        return added
+
+    def _stream_preload(self, task_id: str, client: SpotifyClient, info: dict) -> dict:
+        """List a playlist/album/artist page by page into the task's tracks"""
+        from spotify_api import SpotifyAPIError
+
+        try:
+            for page in client.iter_track_pages(info['type'], info['id']):
+                if self._is_stopped(task_id):
+                    return {'success': False, 'error': 'Cancelled by user'}
+                self._add_tracks(task_id, page, status='resolved')
+        except SpotifyAPIError as e:
+            return {'success': False, 'error': str(e)}
+        with self.tasks_lock:
+            total = self.tasks.get(task_id, {}).get('total_tracks', 0)
+        self._log(task_id, f"Found {total} tracks")
+        return {'success': True}
+
+    def _run_streaming(
+        self, task_id: str, client: SpotifyClient, info: dict, download_path: str, config: dict
+    ) -> dict:
+        """
+        Download an artist's tracks while its discography is still being listed: each
+        page of tracks joins the task's track list and fills shards that start right away.
+        """
+        from spotify_api import SpotifyAPIError
+
+        shard_size = config.get('shard_size', 50)
+        workers = config.get('shard_workers', 4)
+        with self.tasks_lock:
+            task = self.tasks[task_id]
+            task['expanding'] = True
+            task.setdefault('shards', {'total': 0, 'completed': 0, 'failed': 0})
+            # When resuming, tracks listed before the pause that aren't downloaded yet go first
+            pending = [t['url'] for t in task['tracks'] if t.get('url') and t.get('status') == 'queued']
+            size = estimate_bytes([None] * len(task['tracks']), config)
+
+        self._log(task_id, 'Listing discography; downloads start with the first tracks found')
+        futures = []
+        error = None
+        admitted = False
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'stream-{task_id[:8]}') as pool:
+            def submit(batch: List[str]):
+                with self.tasks_lock:
+                    task['shards']['total'] += 1
+                futures.append(pool.submit(self._run_shard, task_id, batch, download_path, config))
+
+            try:
+                for page in client.iter_track_pages(info['type'], info['id']):
+                    if self._is_stopped(task_id):
+                        break
+                    added = self._add_tracks(task_id, page)
+                    with self.tasks_lock:
+                        self.task_songs.setdefault(task_id, {}).update({s['url']: s for s in added})
+                    pending.extend(s['url'] for s in added)
+                    size += estimate_bytes([s.get('duration') for s in added], config)
+
+                    if not admitted:
+                        admission = self._admit(task_id, download_path, size, config)
+                        if not admission['admitted']:
+                            error = admission['error']
+                            break
+                        admitted = True
+                    elif config.get('admission_control', True):
+                        # Already admitted: this only grows the task's reservation
+                        self.admission.admit(task_id, Path(download_path), size)
+
+                    # The first shard goes out with the first page; the rest once they are full
+                    while len(pending) >= shard_size or (pending and not futures):
+                        submit(pending[:shard_size])
+                        pending = pending[shard_size:]
                 else:
-                    self.tasks[task_id]['status'] = 'failed'
-                    final_msg = f"Download failed: {result.get('error', 'Unknown error')}"
-                self.tasks[task_id]['updated_at'] = datetime.now().isoformat()
+                    with self.tasks_lock:
+                        task['expanding'] = False
+            except SpotifyAPIError as e:
+                error = f'Listing the discography failed: {e}'
+                self._log(task_id, error)
+
+            if not self._is_stopped(task_id) and error is None:
+                for i in range(0, len(pending), shard_size):
+                    submit(pending[i:i + shard_size])
+            results = [f.result() for f in futures]
+
+        if error:
+            return {'success': False, 'error': error}
+        verification = None
+        if config.get('verify_downloads', True) and not self._is_stopped(task_id):
+            urls = list(self.task_songs.get(task_id, {}))
+            verification = self._verify_downloads(task_id, urls, download_path, config)
+        failed = sum(1 for r in results if not r['success'])
+        if failed:
+            return {'success': False, 'error': f'{failed} of {len(results)} shards failed'}
+        if verification and verification['failed']:
+            return {'success': False, 'error': f"{verification['failed']} track(s) failed verification"}
+        return {'success': True}
+
+    def get_task_tracks(self, task_id: str, offset: int = 0, limit: int = 100, status: str | None = None) -> Optional[dict]:
+        """A page of a task's track list, which keeps growing while a discography is listed"""
+        task = self.get_task(task_id)
+        if not task:
+            return None
+        with self.tasks_lock:
+            tracks = [t for t in task.get('tracks', []) if not status or t.get('status') == status]
+            page = [dict(t) for t in tracks[offset:offset + limit]]
+            expanding = bool(task.get('expanding'))
+        return {
+            'tracks': page,
+            'total': len(tracks),
+            'offset': offset,
+            'limit': limit,
+            'expanding': expanding,
+        }
 
-            self._log(task_id, final_msg)
+    # ---------------------------- Sharding ---------------------------- #
+    def _resolve_tracks(self, task_id: str, url: str, config: dict) -> Optional[List[dict]]:
+        """Resolve a playlist/album/artist URL into spotdl song dicts via `spotdl save`"""
+        fd, save_file = tempfile.mkstemp(suffix='.spotdl', prefix='grovegrab-')
+        os.close(fd)
+        try:
+            self._log(task_id, 'Resolving track list...')
+            cmd = self._build_spotdl_command(url, config, save_file=save_file)
+            result = self._execute_spotdl(task_id, cmd)
+            if not result['success']:
+                self._log(task_id, f"Track resolution failed: {result.get('error', 'Unknown error')}")
+                return None
+            with open(save_file, 'r', encoding='utf-8') as f:
+                songs = json.load(f)
+            return [s for s in songs if isinstance(s, dict) and s.get('url')]
         except Exception as e:
-            logger.error(f"Download error for task {task_id}: {e}")
+            logger.error(f"Track resolution error for task {task_id}: {e}")
+            self._log(task_id, f"Track resolution failed: {e}")
+            return None
+        finally:
+            try:
+                os.unlink(save_file)
+            except OSError:
+                pass
+
+    def _run_sharded(self, task_id: str, url: str, download_path: str, config: dict) -> dict:
+        """Split a large task into shards of track URLs and download them with several workers"""
+        songs = self._resolve_tracks(task_id, url, config)
+        if songs is None:
+            return {'success': False, 'error': 'Could not resolve track list'}
+        return self._download_songs(task_id, songs, download_path, config)
+
+    def _download_songs(self, task_id: str, songs: List[dict], download_path: str, config: dict) -> dict:
+        """Download resolved songs in shards of track URLs, several shards at a time"""
+        if not songs:
+            return {'success': True}
+
+        with self.tasks_lock:
+            task = self.tasks.get(task_id)
+            reason = self._stop_reason(task)
+            if reason:
+                return {'success': False, 'error': reason}
+            task['total_tracks'] = len(songs)
+            task['tracks'] = [
+                {
+                    'title': song_display_name(s),
+                    'status': 'queued',
+                    'progress': 0,
+                    'id': s.get('song_id'),
+                    'url': s['url'],
+                }
+                for s in songs
+            ]
+            self.task_songs[task_id] = {s['url']: s for s in songs}
+        self._journal_resolved(task_id, songs)
+        return self._run_shards(task_id, [s['url'] for s in songs], download_path, config)
+
+    def _run_shards(
+        self, task_id: str, urls: List[str], download_path: str, config: dict, verify: bool = True
+    ) -> dict:
+        shard_size = config.get('shard_size', 50)
+        if config.get('media_cache'):
+            # Tracks with cached lyrics first, so whole shards can run without lyrics lookups
+            songs = self.task_songs.get(task_id, {})
+            cached = {u for u in urls if u in songs and self.media_cache.has_lyrics(songs[u])}
+            urls = [u for u in urls if u in cached] + [u for u in urls if u not in cached]
+        shards = [urls[i:i + shard_size] for i in range(0, len(urls), shard_size)]
+        workers = min(config.get('shard_workers', 4), len(shards))
+
+        songs = self.task_songs.get(task_id, {})
+        size = estimate_bytes([songs.get(u, {}).get('duration') for u in urls], config)
+        admission = self._admit(task_id, download_path, size, config)
+        if not admission['admitted']:
+            return {'success': False, 'error': admission['error']}
+
+        with self.tasks_lock:
+            task = self.tasks.get(task_id)
+            if not task:
+                return {'success': False, 'error': 'Cancelled by user'}
+            # Counts add up over resumed runs and repair rounds
+            task.setdefault('shards', {'total': 0, 'completed': 0, 'failed': 0})['total'] += len(shards)
+
+        self._log(task_id, f"Downloading {len(urls)} tracks in {len(shards)} shards with {workers} workers")
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'shard-{task_id[:8]}') as pool:
+            results = list(pool.map(
+                lambda shard: self._run_shard(task_id, shard, download_path, config), shards
+            ))
+
+        verification = None
+        if verify and config.get('verify_downloads', True) and not self._is_stopped(task_id):
+            verification = self._verify_downloads(task_id, urls, download_path, config)
+
+        failed = sum(1 for r in results if not r['success'])
+        if failed:
+            return {'success': False, 'error': f'{failed} of {len(shards)} shards failed'}
+        if verification and verification['failed']:
+            return {'success': False, 'error': f"{verification['failed']} track(s) failed verification"}
+        return {'success': True}
+
+    def _run_shard(self, task_id: str, shard: List[str], download_path: str, config: dict) -> dict:
+        with self.tasks_lock:
+            reason = self._stop_reason(self.tasks.get(task_id))
+            if reason:
+                return {'success': False, 'error': reason}
+
+        songs = self.task_songs.get(task_id, {})
+        audio_format = config.get('audio_format', 'mp3')
+        ext = NATIVE_FORMAT if audio_format == 'native' else audio_format
+        # spotdl embeds the art itself into containers the cache can't tag
+        use_cache = (
+            bool(config.get('media_cache')) and ext in TAGGABLE_FORMATS and all(u in songs for u in shard)
+        )
+        cached_lyrics = use_cache and all(self.media_cache.has_lyrics(songs[u]) for u in shard)
+
+        started = time.time()
+        cmd = self._build_spotdl_command(
+            shard, config, download_path=download_path,
+            skip_album_art=use_cache, lyrics=not cached_lyrics,
+        )
+        result = self._execute_spotdl(task_id, cmd)
+        if use_cache:
+            self._apply_media_cache(task_id, shard, download_path, config, started, cached_lyrics)
+
+        with self.tasks_lock:
+            task = self.tasks.get(task_id)
+            if task and 'shards' in task:
+                task['shards']['completed' if result['success'] else 'failed'] += 1
+        return result
+
+    def _apply_media_cache(
+        self, task_id: str, shard: List[str], download_path: str, config: dict, since: float, cached_lyrics: bool
+    ):
+        """Embed cached art (and lyrics) into the shard's new files, and cache the lyrics spotdl found"""
+        songs = self.task_songs.get(task_id, {})
+        with self.tasks_lock:
+            task = self.tasks.get(task_id) or {}
+            done = {t.get('url') for t in task.get('tracks', []) if t.get('status') == 'completed'}
+
+        audio_format = config.get('audio_format', 'mp3')
+        ext = NATIVE_FORMAT if audio_format == 'native' else audio_format
+        tagged = 0
+        for url in shard:
+            if url not in done:
+                continue
+            song = songs[url]
+            path = expected_file_path(song, download_path, ext)
+            try:
+                # Files skipped as already present were tagged when they were downloaded
+                if not path or os.path.getmtime(path) < since:
+                    continue
+            except OSError:
+                continue
+            if cached_lyrics:
+                tagged += self.media_cache.embed(path, song, self.media_cache.get_lyrics(song))
+            else:
+                self.media_cache.harvest_lyrics(path, song)
+                tagged += self.media_cache.embed(path, song)
+        if tagged:
+            self._log(task_id, f"Embedded cached artwork{' and lyrics' if cached_lyrics else ''} into {tagged} file(s)")
+
+    # ---------------------------- Verification ---------------------------- #
+    def _verify_downloads(self, task_id: str, urls: List[str], download_path: str, config: dict) -> dict:
+        """
+        Check the task's finished tracks, download broken ones once more, and bring the
+        playlist's manifest up to date. Files unchanged since their last check are skipped.
+        """
+        songs = self.task_songs.get(task_id, {})
+        with self.tasks_lock:
+            task = self.tasks.get(task_id)
+            if not task:
+                return {'checked': 0, 'unchanged': 0, 'missing': 0, 'repaired': 0, 'failed': 0}
+            task_url = task['url']
+
+        info = self.validate_url(task_url)
+        first = songs.get(urls[0], {}) if urls else {}
+        name = first.get('list_name') or f"{info.get('type')}-{info.get('id')}"
+        manifest = LibraryManifest(Path(download_path), name, task_url)
+        summary = {'checked': 0, 'unchanged': 0, 'missing': 0, 'repaired': 0, 'failed': 0}
+
+        bad = self._check_tracks(task_id, manifest, urls, download_path, config, summary)
+        if bad:
+            self._log(task_id, f"Verification: {len(bad)} broken file(s), downloading them again")
             with self.tasks_lock:
-                self.tasks[task_id]['status'] = 'failed'
-                self.tasks[task_id]['updated_at'] = datetime.now().isoformat()
-            self._log(task_id, f"Error: {str(e)}")
+                for url, result in bad:
+                    self._delete_track_file(result['path'])
+                    t = self._track_by_url(task, url)
+                    t.update({'status': 'queued', 'progress': 0})
+                    task['completed_tracks'] = max(0, (task.get('completed_tracks') or 0) - 1)
+                self._update_progress(task)
+            self._run_shards(task_id, [url for url, _ in bad], download_path, config, verify=False)
+
+            # The repair round has its own counts: the summary describes each track once
+            recheck = {'checked': 0, 'unchanged': 0, 'missing': 0}
+            still_bad = dict(self._check_tracks(task_id, manifest, [url for url, _ in bad], download_path, config, recheck))
+            with self.tasks_lock:
+                for url, result in bad:
+                    t = self._track_by_url(task, url)
+                    if t.get('status') == 'completed' and url not in still_bad:
+                        summary['repaired'] += 1
+                        continue
+                    summary['failed'] += 1
+                    if t.get('status') == 'failed':
+                        continue  # the re-download itself failed and was counted then
+                    if t.get('status') == 'completed':
+                        task['completed_tracks'] = max(0, (task.get('completed_tracks') or 0) - 1)
+                    result = still_bad.get(url, result)
+                    t['status'] = 'failed'
+                    task['failed_tracks'] = (task.get('failed_tracks') or 0) + 1
+                    task['failed_track_list'].append(f"{t.get('title')}: {'; '.join(result['problems'])}")
+                    self.journal.record('failed', task_id, track=t.get('id') or t.get('title'), err='verification')
+                self._update_progress(task)
+
+        try:
+            manifest.save()
+        except OSError as e:
+            self._log(task_id, f"Could not write manifest: {e}")
+        with self.tasks_lock:
+            task['verification'] = summary
+            task['manifest'] = manifest.summary()
+        self._log(
+            task_id,
+            f"Verification: {summary['checked']} checked, {summary['unchanged']} unchanged, "
+            f"{summary['repaired']} repaired, {summary['failed']} failed; manifest {manifest.m3u_path.name}",
+        )
+        return summary
+
+    def _check_tracks(
+        self, task_id: str, manifest: LibraryManifest, urls: List[str], download_path: str, config: dict, summary: dict
+    ) -> List[tuple]:
+        """Verify the completed tracks among `urls`; returns (url, result) of the broken ones"""
+        songs = self.task_songs.get(task_id, {})
+        audio_format = config.get('audio_format', 'mp3')
+        ext = NATIVE_FORMAT if audio_format == 'native' else audio_format
+        with self.tasks_lock:
+            task = self.tasks.get(task_id) or {}
+            completed = {t.get('url') for t in task.get('tracks', []) if t.get('status') == 'completed'}
+
+        todo = []
+        for url in urls:
+            song = songs.get(url)
+            if url not in completed or not song:
+                continue
+            path = expected_file_path(song, download_path, ext)
+            if not path:
+                continue
+            if manifest.unchanged(song['song_id'], path):
+                summary['unchanged'] += 1
+                continue
+            todo.append((url, song, path))
+
+        results = self.verifier.verify(
+            [(path, song.get('duration')) for _, song, path in todo], decode=config.get('verify_decode', True)
+        )
+        bad = []
+        for (url, song, _), result in zip(todo, results):
+            if result['problems'] == ['file missing']:
+                # Saved under another name than expected (e.g. renamed by spotdl); nothing to judge
+                summary['missing'] += 1
+                continue
+            summary['checked'] += 1
+            manifest.update(song['song_id'], song_display_name(song), result)
+            if not result['ok']:
+                bad.append((url, result))
+        return bad
+
+    @staticmethod
+    def _update_progress(task: dict):
+        """Recompute the task's percentage from its track counters (caller holds tasks_lock)"""
+        total = task.get('total_tracks') or 0
+        completed = task.get('completed_tracks') or 0
+        if total > 0:
+            task['progress'] = int((completed / total) * 100)
+        task['updated_at'] = datetime.now().isoformat()
+
+    @staticmethod
+    def _track_by_url(task: dict, url: str) -> dict:
+        return next((t for t in task.get('tracks', []) if t.get('url') == url), {})
+
+    # ---------------------------- Admission ---------------------------- #
+    def _remaining_fraction(self, task_id: str) -> float:
+        with self.tasks_lock:
+            task = self.tasks.get(task_id)
+            return 1 - (task.get('progress') or 0) / 100 if task else 0.0
+
+    def _estimate_url(self, url: str, config: dict) -> int:
+        """Expected size of everything a URL resolves to, from the Spotify API's track count if possible"""
+        info = self.validate_url(url)
+        count = None
+        client = self._spotify_client(config)
+        if client:
+            from spotify_api import SpotifyAPIError
+
+            try:
+                count = client.get_track_count(info.get('type'), info.get('id'))
+            except SpotifyAPIError as e:
+                logger.debug(f"Could not size {url}: {e}")
+        if count is None:
+            count = DEFAULT_TRACK_COUNTS.get(info.get('type'), 1)
+        return estimate_bytes([None] * count, config)
+
+    def _admit(self, task_id: str, download_path: str, size: int, config: dict) -> dict:
+        """Wait (as 'queued') until the target disk has room and a free writer slot for the task"""
+        if not config.get('admission_control', True):
+            return {'admitted': True, 'error': None}
+
+        def on_wait(reason: str):
+            with self.tasks_lock:
+                task = self.tasks.get(task_id)
+                if task and task['status'] == 'running':
+                    task['status'] = 'queued'
+                    task['updated_at'] = datetime.now().isoformat()
+            self._log(task_id, f"Queued: {reason}")
+
+        with self.tasks_lock:
+            priority = (self.tasks.get(task_id) or {}).get('priority')
+        result = self.admission.admit(
+            task_id, Path(download_path), size,
+            should_abort=lambda: self._is_stopped(task_id), on_wait=on_wait, priority=priority,
+        )
+        with self.tasks_lock:
+            task = self.tasks.get(task_id)
+            if task and task['status'] == 'queued':
+                task['status'] = 'running'
+                task['updated_at'] = datetime.now().isoformat()
+            # Cancelled, paused or deleted between the last abort check and admission
+            reason = self._stop_reason(task) if result['admitted'] else None
+        if reason:
+            self.admission.release(task_id)
+            return {'admitted': False, 'error': reason}
+        if result['admitted']:
+            self._log(task_id, f"Admitted to {download_path} (about {size / 1e6:.0f} MB expected)")
+        else:
+            self._log(task_id, f"Not started: {result['error']}")
+        return result
 
     # ---------------------------- SpotDL ---------------------------- #
     def _build_spotdl_command(
-        self, url: str, download_path: str | None = None, preload_only: bool = False
+        self,
+        url: str | List[str],
+        config: dict,
+        download_path: str | None = None,
+        preload_only: bool = False,
+        save_file: str | None = None,
+        skip_album_art: bool = False,
+        lyrics: bool = True,
     ) -> List[str]:
         cmd = ['spotdl']
-        cmd.append(url)
+        if save_file:
+            cmd.append('save')
+        cmd.extend(url if isinstance(url, list) else [url])
 
-        if self.config.get('client_id') and self.config.get('client_secret'):
-            cmd.extend(['--client-id', self.config['client_id'], '--client-secret', self.config['client_secret']])
+        if config.get('client_id') and config.get('client_secret'):
+            cmd.extend(['--client-id', config['client_id'], '--client-secret', config['client_secret']])
 
-        if preload_only:
+        if save_file:
+            cmd.extend(['--save-file', save_file])
+        elif preload_only:
             cmd.append('--preload')
         else:
             if download_path:
                 cmd.extend(['--output', download_path])
 
-            audio_format = self.config.get('audio_format', 'mp3')
+            audio_format = config.get('audio_format', 'mp3')
+            if audio_format == 'native':
+                audio_format = NATIVE_FORMAT
             cmd.extend(['--format', audio_format])
 
             if audio_format == 'mp3':
-                quality = self.config.get('audio_quality', '320k')
+                quality = config.get('audio_quality', '320k')
                 cmd.extend(['--bitrate', quality])
+            elif audio_format in PASSTHROUGH_FORMATS:
+                # Same codec as the source: copy the stream instead of decoding and re-encoding it
+                cmd.extend(['--bitrate', 'disable'])
+
+            threads = config.get('download_threads', 0)
+            if threads:
+                cmd.extend(['--threads', str(threads)])
+
+            rate = self._download_rate_limit(config)
+            if rate:
+                cmd.extend(['--yt-dlp-args', f'--limit-rate {rate}'])
+
+            # Art and lyrics coming from the media cache are embedded after the download
+            if skip_album_art:
+                cmd.append('--skip-album-art')
+            if not lyrics:
+                cmd.append('--lyrics')  # no providers: no lookups
 
             # Skip already-downloaded songs if files exist
             cmd.extend(['--overwrite', 'skip'])
 
         return cmd
 
+    def _download_rate_limit(self, config: dict) -> Optional[int]:
+        """
+        Per-download yt-dlp rate (bytes/s) for a spotdl process starting now: the time-of-day
+        cap split evenly over every download the spotdl slots can run at once. Processes
+        keep the rate they started with when the schedule moves on.
+        """
+        cap = bandwidth_cap(datetime.now(), config.get('bandwidth_schedule', ''))
+        if not cap:
+            return None
+        downloads = self.concurrency.effective_limit * (config.get('download_threads') or SPOTDL_DEFAULT_THREADS)
+        return max(1024, cap // max(1, downloads))
+
+    @staticmethod
+    def _stop_reason(task: Optional[dict]) -> Optional[str]:
+        """Why a task's remaining work must not run (cancelled, paused or deleted), if it mustn't"""
+        if task is None or task.get('cancelled'):
+            return 'Cancelled by user'
+        if task.get('paused'):
+            return 'Paused'
+        return None
+
+    def _is_stopped(self, task_id: str) -> bool:
+        with self.tasks_lock:
+            return self._stop_reason(self.tasks.get(task_id)) is not None
+
     def _execute_spotdl(self, task_id: str, cmd: List[str]) -> dict:
+        slot = None
         try:
+            process = None
+            with self.tasks_lock:
+                task = self.tasks.get(task_id, {})
+                client, priority = task.get('client'), task.get('priority')
+            slot = self.concurrency.acquire(
+                should_abort=lambda: self._is_stopped(task_id),
+                task_id=task_id,
+                client=client,
+                priority=priority,
+                cost=unit_cost(cmd),
+            )
+            if not slot:
+                return {'success': False, 'error': 'Cancelled by user'}
+            with self.tasks_lock:
+                reason = self._stop_reason(self.tasks.get(task_id))
+            if reason:  # stopped after the slot was granted
+                return {'success': False, 'error': reason}
             self._log(task_id, f"Executing: {' '.join(cmd[:2])}...")  # Avoid logging credentials
 
             process = subprocess.Popen(
@@ -280,9 +1192,19 @@ class DownloadManager:
                 text=True,
                 bufsize=1,
                 universal_newlines=True,
+                **popen_kwargs(),  # own process group, so cancel can stop yt-dlp/ffmpeg children too
             )
             with self.tasks_lock:
-                self.processes[task_id] = process
+                self.processes.setdefault(task_id, []).append(process)
+                # A cancel/pause that snapshotted the processes before this one was added
+                # doesn't know about it, so it's stopped here
+                reason = self._stop_reason(self.tasks.get(task_id))
+            if reason:
+                kill_tree(process)
+                return {'success': False, 'error': reason}
+            # spotdl works through its songs one after another, so a track without a
+            # "Downloading" line is timed from the previous one's end
+            clock = {'last': time.monotonic(), 'started': {}}
 
             dns_error_count = 0
             for line in iter(process.stdout.readline, ''):
@@ -299,21 +1221,23 @@ class DownloadManager:
                         self._log(task_id, '⚠️ Network/DNS error detected. Retrying...')
                     continue
 
+                if '429' in line or 'Too Many Requests' in line or 'rate limit' in line.lower():
+                    self.concurrency.record_throttle()
+
                 if 'ConnectionResetError' in line or 'Connection broken' in line:
                     self._log(task_id, '⚠️ Connection issue detected. SpotDL will retry automatically...')
                     continue
 
-                # Check cancellation quickly
+                # Check cancellation/pause quickly
                 with self.tasks_lock:
-                    if self.tasks.get(task_id, {}).get('cancelled'):
-                        try:
-                            process.terminate()
-                        except Exception:
-                            pass
-                        return {'success': False, 'error': 'Cancelled by user'}
+                    reason = self._stop_reason(self.tasks.get(task_id))
+                if reason:
+                    kill_tree(process)  # the whole group, so no yt-dlp/ffmpeg child outlives it
+                    return {'success': False, 'error': reason}
 
                 self._log(task_id, line)
-                self._parse_progress(task_id, line)
+                for event, track in self._parse_progress(task_id, line):
+                    self._journal_track(task_id, event, track, line, cmd, clock)
 
             process.wait()
             
@@ -332,19 +1256,28 @@ class DownloadManager:
                 error_msg = 'Network error: Cannot resolve Spotify/YouTube domains. Check your internet connection.'
             return {'success': False, 'error': error_msg}
         finally:
+            if slot:
+                self.concurrency.release(slot)
             with self.tasks_lock:
-                self.processes.pop(task_id, None)
+                procs = self.processes.get(task_id, [])
+                if process in procs:
+                    procs.remove(process)
+                if not procs:
+                    self.processes.pop(task_id, None)
 
     # ---------------------------- Parsing ---------------------------- #
-    def _parse_progress(self, task_id: str, line: str):
+    def _parse_progress(self, task_id: str, line: str) -> List[tuple]:
+        """Update the task from one line of spotdl output; returns the (event, track) transitions it made"""
+        events = []
         with self.tasks_lock:
             task = self.tasks.get(task_id)
             if not task:
-                return
+                return events
 
             # Infer total tracks
+            # (sharded tasks know their total up front; each shard reports only its own)
             m_total = re.search(r"Found\s+(\d+)\s+(songs?|tracks?)", line, re.IGNORECASE)
-            if m_total:
+            if m_total and 'shards' not in task:
                 try:
                     task['total_tracks'] = int(m_total.group(1))
                 except Exception:
@@ -385,16 +1318,24 @@ class DownloadManager:
                 task['current_track'] = title
                 t = ensure_track(title)
                 if t:
+                    if t['status'] not in ('downloading', 'completed'):
+                        events.append(('started', t))
                     t['status'] = 'downloading'
                     if percent is not None:
                         t['progress'] = percent
 
-            if 'downloaded' in lowered or 'completed' in lowered:
+            # "Skipping Artist - Title (file already exists) ..." from --overwrite skip
+            m_skip = re.search(r"Skipping (.+?) \((?:file already exists|skip file found)\)", line)
+            if m_skip:
+                title = m_skip.group(1)
+
+            if 'downloaded' in lowered or 'completed' in lowered or m_skip:
                 t = ensure_track(title or task.get('current_track'))
                 if t and t['status'] != 'completed':
                     t['status'] = 'completed'
                     t['progress'] = 100
                     task['completed_tracks'] = (task.get('completed_tracks') or 0) + 1
+                    events.append(('skipped' if m_skip else 'finished', t))
 
             if 'failed' in lowered or 'error' in lowered:
                 t = ensure_track(title or task.get('current_track'))
@@ -404,13 +1345,106 @@ class DownloadManager:
                         t['progress'] = 0
                     task['failed_tracks'] = (task.get('failed_tracks') or 0) + 1
                     task['failed_track_list'].append(line)
+                    events.append(('failed', t))
+
+            self._update_progress(task)
+
+        # The limiter's lock is taken outside tasks_lock (acquire() reads tasks while holding it)
+        for event, _ in events:
+            if event == 'failed':
+                self.concurrency.record_error()
+            elif event != 'started':
+                self.concurrency.record_completion()
+        return events
+
+    # ---------------------------- Schedules ---------------------------- #
+    def start_scheduler(self):
+        """Start firing scheduled jobs (the server calls this; workers only run what it queues)"""
+        self.scheduler.start()
+
+    def get_schedules(self) -> dict:
+        return self.scheduler.status()
+
+    def add_schedule(self, spec: dict) -> dict:
+        """Validate and store a scheduled job; bulk URLs (and syncs) default to the off-peak windows"""
+        info = self.validate_url(spec.get('url', ''))
+        if not info.get('valid'):
+            raise ScheduleError(info['error'])
+        if spec.get('kind') == 'sync' and info['type'] != 'playlist':
+            raise ScheduleError('Sync only supports playlist URLs')
+        if spec.get('offpeak') is None:
+            spec = {**spec, 'offpeak': spec.get('kind') == 'sync' or info['type'] in SHARDABLE_TYPES}
+        return self.scheduler.add(spec)
+
+    def update_schedule(self, job_id: str, changes: dict) -> Optional[dict]:
+        return self.scheduler.update(job_id, changes)
+
+    def delete_schedule(self, job_id: str) -> bool:
+        return self.scheduler.remove(job_id)
+
+    def run_schedule(self, job_id: str) -> Optional[str]:
+        return self.scheduler.run_now(job_id)
+
+    def _launch_scheduled(self, job: dict, task_id: str):
+        """Start a scheduled job the way an API request would (queued for a worker in queue mode)"""
+        scheduling = {'priority': job.get('priority', DEFAULT_PRIORITY), 'client': 'scheduler'}
+        if job['kind'] == 'sync':
+            target, args = self.start_sync, (task_id, job['url'], job.get('download_path'), job.get('prune', False))
+        else:
+            target, args = self.start_download, (task_id, job['url'], job.get('download_path'), job.get('parallel'))
+        logger.info(f"Task {task_id}: starting scheduled {job['kind']} {job['id']}")
+        threading.Thread(target=target, args=args, kwargs=scheduling, daemon=True).start()
 
-            total = task.get('total_tracks') or 0
-            completed = task.get('completed_tracks') or 0
-            if total > 0:
-                task['progress'] = int((completed / total) * 100)
+    def _is_task_active(self, task_id: str) -> bool:
+        with self.tasks_lock:
+            task = self.tasks.get(task_id)
+        if not task and self.job_queue:
+            task = self.job_queue.get_task(task_id)
+        return bool(task) and task.get('status') not in FINISHED_STATUSES
+
+    # ---------------------------- Journal ---------------------------- #
+    def _journal_resolved(self, task_id: str, songs: List[dict]):
+        for s in songs:
+            self.journal.record('resolved', task_id, track=s.get('song_id'), dur=s.get('duration'))
+
+    def _journal_track(self, task_id: str, event: str, track: dict, line: str, cmd: List[str], clock: dict):
+        """Record a track transition seen in spotdl output; `clock` is the process's timing state"""
+        key = track.get('id') or track.get('title')
+        now = time.monotonic()
+        if event == 'started':
+            clock['started'][key] = now
+            self.journal.record('started', task_id, track=key)
+            return
+        if event == 'failed':
+            self.journal.record('failed', task_id, track=key, err=error_class(line))
+            return
+        started = clock['started'].pop(key, clock['last'])
+        clock['last'] = now
+        if event == 'skipped':
+            self.journal.record('skipped', task_id, track=key)
+            return
+        self.journal.record(
+            'finished',
+            task_id,
+            track=key,
+            ms=int((now - started) * 1000),
+            bytes=self._track_bytes(task_id, track, cmd),
+            src=source_host(line),
+        )
 
-            task['updated_at'] = datetime.now().isoformat()
+    def _track_bytes(self, task_id: str, track: dict, cmd: List[str]) -> Optional[int]:
+        if '--output' not in cmd:
+            return None
+        download_path = cmd[cmd.index('--output') + 1]
+        ext = cmd[cmd.index('--format') + 1] if '--format' in cmd else 'mp3'
+        song = self.task_songs.get(task_id, {}).get(track.get('url'))
+        path = expected_file_path(song, download_path, ext) if song else None
+        # Unresolved tracks are titled "Artists - Title", which is also spotdl's file name
+        path = path or str(Path(download_path) / f"{track.get('title')}.{ext}")
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return None
 
     # ---------------------------- Logging ---------------------------- #
     def _log(self, task_id: str, message: str):
@@ -421,26 +1455,139 @@ class DownloadManager:
                 self.tasks[task_id].setdefault('logs', []).append(entry)
         logger.info(f"Task {task_id}: {message}")
 
+    # ---------------------------- Retention ---------------------------- #
+    def _retention_loop(self):
+        while True:
+            time.sleep(RETENTION_INTERVAL)
+            try:
+                self.enforce_retention()
+            except Exception as e:
+                logger.error(f"Retention sweep failed: {e}")
+
+    def enforce_retention(self) -> int:
+        """Move finished tasks past max age, then least recently used ones past max count, to the archive"""
+        if not self.retention:
+            return 0
+        config = self.config_store.snapshot()
+        max_live = config.get('max_live_tasks', 200)
+        max_age_hours = config.get('task_max_age_hours', 24)
+
+        evicted = 0
+        if self.job_queue:
+            queued = self.job_queue.list_tasks()
+            finished_jobs = [t for t in queued if t.get('status') in FINISHED_STATUSES]
+            evict_jobs = self._select_evictions(len(queued), finished_jobs, max_live, max_age_hours)
+            if evict_jobs:
+                self.archive.archive(evict_jobs)
+                evicted += self.job_queue.delete([t['id'] for t in evict_jobs])
+
+        with self.tasks_lock:
+            finished = [t for t in self.tasks.values() if t.get('status') in FINISHED_STATUSES]
+            evict = self._select_evictions(len(self.tasks), finished, max_live, max_age_hours)
+
+        if not evict:
+            return evicted
+
+        # Write to the archive before dropping from memory so a task is never in neither place
+        self.archive.archive(evict)
+        with self.tasks_lock:
+            for t in evict:
+                current = self.tasks.get(t['id'])
+                # Skip tasks that were retried (and are running again) while archiving
+                if current is t and current.get('status') in FINISHED_STATUSES:
+                    self.tasks.pop(t['id'], None)
+                    self.task_configs.pop(t['id'], None)
+                    self.task_access.pop(t['id'], None)
+                    self.task_songs.pop(t['id'], None)
+        logger.info(f"Archived {len(evict)} finished task(s)")
+        return evicted + len(evict)
+
+    def _select_evictions(self, live_count: int, finished: List[dict], max_live: int, max_age_hours: int) -> List[dict]:
+        evict = []
+        if max_age_hours:
+            cutoff = datetime.now().timestamp() - max_age_hours * 3600
+            for t in finished:
+                try:
+                    if datetime.fromisoformat(t['updated_at']).timestamp() < cutoff:
+                        evict.append(t)
+                except (KeyError, ValueError):
+                    continue
+
+        overflow = live_count - len(evict) - max_live
+        if overflow > 0:
+            evicting = {t['id'] for t in evict}
+            lru = sorted(
+                (t for t in finished if t['id'] not in evicting),
+                key=lambda t: (self.task_access.get(t['id'], 0.0), t.get('updated_at', '')),
+            )
+            evict.extend(lru[:overflow])
+        return evict
+
+    def get_archived_tasks(self, page: int = 1, per_page: int = 50, status: str | None = None) -> dict:
+        return self.archive.query(page=page, per_page=per_page, status=status)
+
     # ---------------------------- Public API ---------------------------- #
     def get_all_tasks(self) -> List[dict]:
         with self.tasks_lock:
-            return list(self.tasks.values())
+            tasks = list(self.tasks.values())
+        if self.job_queue:
+            tasks.extend(self.job_queue.list_tasks())
+        return tasks
 
     def get_task(self, task_id: str) -> Optional[dict]:
         with self.tasks_lock:
-            return self.tasks.get(task_id)
+            task = self.tasks.get(task_id)
+            if task:
+                self.task_access[task_id] = time.monotonic()
+                return task
+        if self.job_queue:
+            task = self.job_queue.get_task(task_id)
+            if task:
+                return task
+        return self.archive.get(task_id)
 
     def get_task_logs(self, task_id: str) -> Optional[List[str]]:
+        task = self.get_task(task_id)
+        return task.get('logs', []) if task else None
+
+    def _stop_processes(self, procs: List[subprocess.Popen]) -> float:
+        """Stop every process tree of a task in parallel; returns seconds until all were reaped"""
+        if not procs:
+            return 0.0
+        with ThreadPoolExecutor(max_workers=len(procs)) as pool:
+            return max(pool.map(kill_tree, procs))
+
+    def _cleanup_partials(self, task: dict) -> int:
+        """
+        Remove partial files a stopped task left in its download folder, unless another
+        unfinished task (a paused one needs its partials to resume) writes there too.
+        spotdl's shared temp dir is left alone: other workers on this host use it as well.
+        """
+        download_path = task.get('download_path')
+        try:
+            since = datetime.fromisoformat(task['created_at']).timestamp()
+        except (KeyError, ValueError):
+            return 0
         with self.tasks_lock:
-            task = self.tasks.get(task_id)
-            return task['logs'] if task else None
+            shared = any(
+                t['id'] != task['id'] and t.get('status') not in FINISHED_STATUSES
+                and t.get('download_path') == download_path
+                for t in self.tasks.values()
+            )
+        if not download_path or shared:
+            return 0
+        return cleanup_partial_files(Path(download_path), since)
 
     def cancel_task(self, task_id: str) -> bool:
-        proc = None
         with self.tasks_lock:
             task = self.tasks.get(task_id)
-            if not task or task['status'] != 'running':
+        if not task:
+            # SQLite may wait on a worker's write lock: never while holding tasks_lock
+            return self.job_queue.request_cancel(task_id) if self.job_queue else False
+        with self.tasks_lock:
+            if task_id not in self.tasks or task['status'] not in STOPPABLE_STATUSES:
                 return False
+            was_paused = task['status'] == 'paused'
             task['cancelled'] = True
             task['status'] = 'cancelled'
             task['updated_at'] = datetime.now().isoformat()
@@ -448,41 +1595,143 @@ class DownloadManager:
                 if t.get('status') in ('downloading', 'queued'):
                     t['status'] = 'cancelled'
             task['current_track'] = ''
-            proc = self.processes.get(task_id)
+            procs = list(self.processes.get(task_id, []))
 
-        # terminate outside lock
-        try:
-            if proc and proc.poll() is None:
-                proc.terminate()
-                try:
-                    proc.wait(timeout=2)
-                except Exception:
-                    if proc.poll() is None:
-                        proc.kill()
-        except Exception:
-            pass
+        # terminate outside lock; doesn't depend on the task's reader thread seeing another line
+        latency = self._stop_processes(procs)
+        removed = self._cleanup_partials(task)
+        with self.tasks_lock:
+            task['cancel_latency_ms'] = round(latency * 1000, 1)
 
-        self._log(task_id, 'Stop requested by user')
+        if was_paused:
+            self._log(task_id, 'Paused task cancelled by user')
+            return True
+        self._log(
+            task_id,
+            f"Stop requested by user ({len(procs)} process tree(s) stopped in {latency * 1000:.0f} ms, "
+            f"{removed} partial file(s) removed)",
+        )
         return True
 
     def delete_task(self, task_id: str) -> bool:
         with self.tasks_lock:
             task = self.tasks.get(task_id)
-            if not task:
+        if not task:
+            if self.job_queue and self.job_queue.get_task(task_id):
+                self.job_queue.request_cancel(task_id)
+                return self.job_queue.delete([task_id]) > 0
+            return self.archive.delete(task_id)
+        with self.tasks_lock:
+            if task_id not in self.tasks:
                 return False
-            proc = self.processes.pop(task_id, None)
-        try:
-            if proc and proc.poll() is None:
-                proc.terminate()
-        except Exception:
-            pass
+            was_running = task.get('status') in ('running', 'pausing')
+            task['cancelled'] = True
+            procs = list(self.processes.get(task_id, []))
+        self._stop_processes(procs)
+        if was_running:
+            self._cleanup_partials(task)
         with self.tasks_lock:
             self.tasks.pop(task_id, None)
+            self.task_configs.pop(task_id, None)
+            self.task_access.pop(task_id, None)
+            self.task_songs.pop(task_id, None)
         return True
 
+    def pause_task(self, task_id: str) -> bool:
+        """
+        Checkpoint a running task: stop its processes and keep what is done. Unfinished
+        tracks go back to 'queued'; the task turns 'paused' once its runner has unwound.
+        """
+        with self.tasks_lock:
+            task = self.tasks.get(task_id)
+            if not task or task['status'] != 'running' or task.get('type') not in ('download', 'sync'):
+                return False
+            task['paused'] = True
+            task['status'] = 'pausing'
+            task['updated_at'] = datetime.now().isoformat()
+            for t in task.get('tracks', []):
+                if t.get('status') == 'downloading':
+                    t['status'] = 'queued'
+                    t['progress'] = 0
+            task['current_track'] = ''
+            procs = list(self.processes.get(task_id, []))
+
+        # Partial files stay: yt-dlp continues .part files when the track is picked up again
+        self._stop_processes(procs)
+        with self.tasks_lock:
+            done = task.get('completed_tracks') or 0
+            remaining = sum(1 for t in task.get('tracks', []) if t.get('status') == 'queued')
+        self._log(task_id, f"Pause requested by user ({done} track(s) done, {remaining} queued)")
+        return True
+
+    def resume_task(self, task_id: str) -> bool:
+        """Continue a paused task from its first unfinished track"""
+        with self.tasks_lock:
+            task = self.tasks.get(task_id)
+            if not task or task['status'] != 'paused':
+                return False
+            task['paused'] = False
+            task['status'] = 'running'
+            task['updated_at'] = datetime.now().isoformat()
+
+        thread = threading.Thread(target=self._run_resumed, args=(task_id,))
+        thread.daemon = True
+        thread.start()
+        return True
+
+    def _run_resumed(self, task_id: str):
+        with self.tasks_lock:
+            task = self.tasks[task_id]
+            config = self.task_configs.get(task_id) or self.config_store.snapshot()
+            url, download_path = task['url'], task['download_path']
+            # Sharded tasks know their track URLs; only the ones not yet downloaded are re-run
+            remaining = [
+                t['url'] for t in task.get('tracks', [])
+                if t.get('url') and t.get('status') == 'queued'
+            ] if 'shards' in task else None
+            if task['type'] == 'sync':
+                # The sync snapshot already holds the finished tracks; the next diff is what's left
+                task.update({'total_tracks': 0, 'completed_tracks': 0, 'tracks': [], 'progress': 0})
+                task.pop('shards', None)
+
+        noun = 'Sync' if task['type'] == 'sync' else 'Download'
+        self._log(task_id, f"{noun} resumed")
+        try:
+            client = self._spotify_client(config) if task.get('expanding') else None
+            if task['type'] == 'sync':
+                info = self.validate_url(url)
+                result = self._run_sync(task_id, info['id'], url, download_path, task.get('prune', False), config)
+            elif client:
+                # Paused while the discography was still being listed: list the rest as well
+                result = self._run_streaming(task_id, client, self.validate_url(url), download_path, config)
+            elif remaining is not None:
+                result = self._run_shards(task_id, remaining, download_path, config) if remaining else {'success': True}
+            else:
+                # Single spotdl run: --overwrite skip passes over the tracks that are already on disk
+                result = self._run_download(task_id, url, download_path, config, task.get('parallel', False))
+            self._finish_task(task_id, result, noun)
+        except Exception as e:
+            logger.error(f"Resume error for task {task_id}: {e}")
+            self.admission.release(task_id)
+            with self.tasks_lock:
+                task['status'] = 'failed'
+                task['updated_at'] = datetime.now().isoformat()
+            self._log(task_id, f"Error: {str(e)}")
+
     def retry_failed(self, task_id: str) -> bool:
         with self.tasks_lock:
             task = self.tasks.get(task_id)
+        if not task and self.job_queue:
+            queued = self.job_queue.get_task(task_id)
+            if not queued or queued.get('status') != 'failed':
+                return False
+            queued.update({
+                'status': 'queued', 'failed_tracks': 0, 'failed_track_list': [],
+                'updated_at': datetime.now().isoformat(),
+            })
+            return self.job_queue.requeue(task_id, queued)
+
+        with self.tasks_lock:
             if not task or task['status'] != 'failed':
                 return False
             # Reset and restart
@@ -491,11 +1740,14 @@ class DownloadManager:
             task['status'] = 'running'
             task['updated_at'] = datetime.now().isoformat()
 
-        import threading
-
-        thread = threading.Thread(
-            target=self.start_download, args=(task_id, task['url'], task.get('download_path'))
-        )
+        if task.get('type') == 'sync':
+            target = self.start_sync
+            args = (task_id, task['url'], task.get('download_path'), task.get('prune', False))
+        else:
+            target = self.start_download
+            args = (task_id, task['url'], task.get('download_path'), task.get('parallel'))
+        kwargs = {'priority': task.get('priority', DEFAULT_PRIORITY), 'client': task.get('client')}
+        thread = threading.Thread(target=target, args=args, kwargs=kwargs)
         thread.daemon = True
         thread.start()
         return True
@@ -0,0 +1,127 @@
+"""
+Fair Share - Priority classes and weighted fair queuing of spotdl work units across tasks and clients
+"""
+from __future__ import annotations
+
+import logging
+import time
+from itertools import count
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_WEIGHTS = {'high': 4, 'normal': 2, 'low': 1}
+DEFAULT_PRIORITY = 'normal'
+DEFAULT_CLIENT = 'local'
+
+SMALL_UNIT_TRACKS = 5  # units this small may use the slot held back from bulk work
+BULK_UNIT_COST = 50  # cost of a playlist/album/artist URL whose track count isn't known up front
+
+
+class FairShare:
+    """
+    Start-time fair queuing over work units (one spotdl process each), costed in tracks.
+
+    Every task is a flow. A client's priority weight is split between its active
+    tasks, so one client with many tasks gets no more than one with a single task,
+    and a large task only advances its own virtual clock: a new single-track task
+    starts at the current virtual time and is served before the big task's next
+    shard. Bulk units are also kept out of the last free slot, so short requests
+    never wait for a long shard to finish.
+
+    Not thread-safe on its own; AdaptiveLimiter calls it under its condition lock.
+    """
+
+    def __init__(self):
+        self.vtime = 0.0
+        self.flows = {}  # task_id -> {'client', 'priority', 'finish', 'units'}
+        self.waiting = []  # tickets not yet granted
+        self.clients = {}  # client -> accounting
+        self._seq = count()
+
+    # ---------------------------- Tickets ---------------------------- #
+    def enqueue(self, task_id: str, client: str | None, priority: str | None, cost: int) -> dict:
+        client = client or DEFAULT_CLIENT
+        priority = priority if priority in PRIORITY_WEIGHTS else DEFAULT_PRIORITY
+        flow = self.flows.setdefault(task_id, {'client': client, 'priority': priority, 'finish': 0.0, 'units': 0})
+        flow['units'] += 1
+
+        start = max(self.vtime, flow['finish'])
+        flow['finish'] = start + cost / self._weight(task_id)
+        ticket = {
+            'task_id': task_id,
+            'client': client,
+            'priority': priority,
+            'cost': cost,
+            'start': start,
+            'seq': next(self._seq),
+        }
+        self.waiting.append(ticket)
+
+        account = self._account(client)
+        account['waiting'] += 1
+        return ticket
+
+    def pick(self, active: int, limit: int) -> Optional[dict]:
+        """The waiting ticket that gets the next free slot, if any slot is free for it"""
+        eligible = [t for t in self.waiting if active < self._slots_for(t, limit)]
+        if not eligible:
+            return None
+        return min(eligible, key=lambda t: (t['start'], t['seq']))
+
+    def grant(self, ticket: dict):
+        self.waiting.remove(ticket)
+        self.vtime = max(self.vtime, ticket['start'])
+        account = self._account(ticket['client'])
+        account['waiting'] -= 1
+        account['active'] += 1
+        account['units_started'] += 1
+        account['tracks_scheduled'] += ticket['cost']
+
+    def discard(self, ticket: dict):
+        """Withdraw a ticket that was never granted (task cancelled or paused while waiting)"""
+        if ticket in self.waiting:
+            self.waiting.remove(ticket)
+            self._account(ticket['client'])['waiting'] -= 1
+            self._unit_done(ticket)
+
+    def done(self, ticket: dict):
+        self._account(ticket['client'])['active'] -= 1
+        self._unit_done(ticket)
+
+    # ---------------------------- Internals ---------------------------- #
+    def _weight(self, task_id: str) -> float:
+        flow = self.flows[task_id]
+        siblings = sum(1 for f in self.flows.values() if f['client'] == flow['client'])
+        return PRIORITY_WEIGHTS[flow['priority']] / siblings
+
+    def _slots_for(self, ticket: dict, limit: int) -> int:
+        if limit > 1 and ticket['cost'] > SMALL_UNIT_TRACKS:
+            return limit - 1
+        return limit
+
+    def _unit_done(self, ticket: dict):
+        flow = self.flows.get(ticket['task_id'])
+        if flow:
+            flow['units'] -= 1
+            if flow['units'] <= 0:
+                # An idle flow keeps no credit; its next unit starts at the current virtual time
+                self.flows.pop(ticket['task_id'], None)
+
+    def _account(self, client: str) -> dict:
+        account = self.clients.setdefault(client, {
+            'active': 0, 'waiting': 0, 'units_started': 0, 'tracks_scheduled': 0, 'last_seen': 0.0,
+        })
+        account['last_seen'] = time.time()
+        return account
+
+    def status(self) -> dict:
+        return {
+            'virtual_time': round(self.vtime, 3),
+            'waiting': [
+                {k: t[k] for k in ('task_id', 'client', 'priority', 'cost')}
+                for t in sorted(self.waiting, key=lambda t: (t['start'], t['seq']))
+            ],
+            'clients': {name: dict(account) for name, account in self.clients.items()},
+        }
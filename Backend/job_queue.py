@@ -0,0 +1,255 @@
+"""
+Job Queue - Durable SQLite job queue shared by the API server and worker processes
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from fair_share import DEFAULT_PRIORITY, PRIORITY_WEIGHTS
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+FINISHED_JOB_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+class JobQueue:
+    """
+    Jobs are leased by workers for `lease_seconds` and kept alive by heartbeats that
+    also carry the worker's current view of the task. A job whose lease runs out
+    (worker crashed or lost) goes back to the queue, up to MAX_ATTEMPTS times.
+    Workers lease higher priority classes first, oldest first within a class.
+
+    The database can live on a disk shared between hosts as long as that filesystem
+    supports SQLite's file locking.
+    """
+
+    def __init__(self, db_path: Path, lease_seconds: float = 60):
+        self.db_path = Path(db_path)
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(
+            '''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                priority INTEGER NOT NULL DEFAULT 2,
+                worker_id TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                task TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+            CREATE TABLE IF NOT EXISTS workers (
+                id TEXT PRIMARY KEY,
+                host TEXT,
+                pid INTEGER,
+                slots INTEGER,
+                active_jobs TEXT,
+                last_seen REAL
+            );
+            '''
+        )
+        # Queues created before jobs had a priority
+        if 'priority' not in {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}:
+            conn.execute('ALTER TABLE jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 2')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs (status, priority DESC, created_at)')
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    # ---------------------------- Producer side ---------------------------- #
+    def enqueue(self, job_id: str, kind: str, payload: dict, task: dict, priority: str = DEFAULT_PRIORITY):
+        now = datetime.now().isoformat()
+        weight = PRIORITY_WEIGHTS.get(priority, PRIORITY_WEIGHTS[DEFAULT_PRIORITY])
+        self._conn().execute(
+            'INSERT OR REPLACE INTO jobs (id, kind, payload, status, priority, task, created_at, updated_at) '
+            "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload), weight, json.dumps(task), now, now),
+        )
+
+    def requeue(self, job_id: str, task: dict) -> bool:
+        cur = self._conn().execute(
+            "UPDATE jobs SET status = 'queued', worker_id = NULL, lease_expires = NULL, attempts = 0, "
+            'cancel_requested = 0, task = ?, updated_at = ? WHERE id = ?',
+            (json.dumps(task), datetime.now().isoformat(), job_id),
+        )
+        return cur.rowcount > 0
+
+    def request_cancel(self, job_id: str) -> bool:
+        """Cancel a queued job outright, or flag a leased one for its worker to stop"""
+        conn = self._conn()
+        now = datetime.now().isoformat()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT status, task FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if not row or row[0] in FINISHED_JOB_STATUSES:
+                conn.execute('COMMIT')
+                return False
+            if row[0] == 'queued':
+                task = json.loads(row[1] or '{}')
+                task.update({'status': 'cancelled', 'cancelled': True, 'updated_at': now})
+                conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', task = ?, updated_at = ? WHERE id = ?",
+                    (json.dumps(task), now, job_id),
+                )
+            else:
+                conn.execute(
+                    'UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ?', (now, job_id)
+                )
+            conn.execute('COMMIT')
+            return True
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def delete(self, job_ids: List[str]) -> int:
+        if not job_ids:
+            return 0
+        placeholders = ','.join('?' * len(job_ids))
+        return self._conn().execute(f'DELETE FROM jobs WHERE id IN ({placeholders})', list(job_ids)).rowcount
+
+    # ---------------------------- Worker side ---------------------------- #
+    def lease(self, worker_id: str) -> Optional[dict]:
+        """Claim the oldest queued (or lease-expired) job of the highest priority waiting"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts, task FROM jobs "
+                "WHERE status = 'queued' OR (status = 'leased' AND lease_expires < ?) "
+                'ORDER BY priority DESC, created_at LIMIT 1',
+                (now,),
+            ).fetchone()
+            if not row:
+                conn.execute('COMMIT')
+                return None
+
+            job_id, kind, payload, attempts, task = row
+            if attempts >= MAX_ATTEMPTS:
+                failed = json.loads(task or '{}')
+                failed.update({'status': 'failed', 'updated_at': datetime.now().isoformat()})
+                failed.setdefault('logs', []).append(f'Job abandoned after {attempts} lost worker leases')
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', task = ?, updated_at = ? WHERE id = ?",
+                    (json.dumps(failed), datetime.now().isoformat(), job_id),
+                )
+                conn.execute('COMMIT')
+                return self.lease(worker_id)
+
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', worker_id = ?, lease_expires = ?, attempts = attempts + 1, "
+                'updated_at = ? WHERE id = ?',
+                (worker_id, now + self.lease_seconds, datetime.now().isoformat(), job_id),
+            )
+            conn.execute('COMMIT')
+            return {'id': job_id, 'kind': kind, 'payload': json.loads(payload), 'attempt': attempts + 1}
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def heartbeat(self, job_id: str, worker_id: str, task: Optional[dict]) -> dict:
+        """Extend the lease and publish progress; tells the worker whether to cancel or whether it lost the job"""
+        conn = self._conn()
+        cur = conn.execute(
+            "UPDATE jobs SET lease_expires = ?, task = COALESCE(?, task), updated_at = ? "
+            "WHERE id = ? AND worker_id = ? AND status = 'leased'",
+            (
+                time.time() + self.lease_seconds,
+                json.dumps(task) if task is not None else None,
+                datetime.now().isoformat(),
+                job_id,
+                worker_id,
+            ),
+        )
+        if cur.rowcount == 0:
+            return {'leased': False, 'cancel': True}
+        row = conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return {'leased': True, 'cancel': bool(row and row[0])}
+
+    def complete(self, job_id: str, worker_id: str, task: dict) -> bool:
+        status = task.get('status') if task.get('status') in FINISHED_JOB_STATUSES else 'failed'
+        cur = self._conn().execute(
+            "UPDATE jobs SET status = ?, task = ?, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND worker_id = ? AND status = 'leased'",
+            (status, json.dumps(task), datetime.now().isoformat(), job_id, worker_id),
+        )
+        return cur.rowcount > 0
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        """Give a leased job back to the queue without counting it as a failed attempt"""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT task FROM jobs WHERE id = ? AND worker_id = ? AND status = 'leased'", (job_id, worker_id)
+        ).fetchone()
+        if not row:
+            return False
+        task = json.loads(row[0] or '{}')
+        task.update({'status': 'queued', 'cancelled': False, 'updated_at': datetime.now().isoformat()})
+        cur = conn.execute(
+            "UPDATE jobs SET status = 'queued', worker_id = NULL, lease_expires = NULL, "
+            'attempts = MAX(attempts - 1, 0), task = ?, updated_at = ? '
+            "WHERE id = ? AND worker_id = ? AND status = 'leased'",
+            (json.dumps(task), datetime.now().isoformat(), job_id, worker_id),
+        )
+        return cur.rowcount > 0
+
+    def register_worker(self, worker_id: str, slots: int, active_jobs: List[str]):
+        self._conn().execute(
+            'INSERT OR REPLACE INTO workers (id, host, pid, slots, active_jobs, last_seen) VALUES (?, ?, ?, ?, ?, ?)',
+            (worker_id, socket.gethostname(), os.getpid(), slots, json.dumps(active_jobs), time.time()),
+        )
+
+    def unregister_worker(self, worker_id: str):
+        self._conn().execute('DELETE FROM workers WHERE id = ?', (worker_id,))
+
+    # ---------------------------- Coordinator reads ---------------------------- #
+    def get_task(self, job_id: str) -> Optional[dict]:
+        row = self._conn().execute('SELECT task FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def list_tasks(self) -> List[dict]:
+        rows = self._conn().execute('SELECT task FROM jobs WHERE task IS NOT NULL ORDER BY created_at').fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def workers(self, stale_after: float = 30) -> List[dict]:
+        rows = self._conn().execute(
+            'SELECT id, host, pid, slots, active_jobs, last_seen FROM workers ORDER BY id'
+        ).fetchall()
+        now = time.time()
+        return [
+            {
+                'id': r[0],
+                'host': r[1],
+                'pid': r[2],
+                'slots': r[3],
+                'active_jobs': json.loads(r[4] or '[]'),
+                'last_seen': datetime.fromtimestamp(r[5]).isoformat(),
+                'alive': now - r[5] < stale_after,
+            }
+            for r in rows
+        ]
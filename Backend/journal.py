@@ -0,0 +1,244 @@
+"""
+Journal - Append-only event journal of task and track lifecycle events, with aggregate stats
+
+Events are buffered in memory and appended in batches, one compact JSON object per
+line, to a file per day (`events-YYYY-MM-DD.jsonl`). Files older than the retention
+period are deleted. Fields that are None are left out of the record:
+
+    ts     unix time (seconds)
+    ev     submitted | resolved | started | finished | skipped | failed | task_finished
+    task   task id
+    track  Spotify track id (or the track's title when spotdl didn't say which)
+    kind   task type / URL type (submitted), final status (task_finished)
+    bytes  size of the finished file
+    dur    track length in seconds according to Spotify (resolved)
+    ms     time taken (track download, or the whole task)
+    src    host the audio came from (finished)
+    err    error class (failed, task_finished)
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 2.0  # seconds between batched writes
+BATCH_SIZE = 256  # flush early once this many events are buffered
+DEFAULT_RETENTION_DAYS = 30
+
+# First matching pattern wins; matched against the lowercased error text
+ERROR_CLASSES = (
+    ('cancelled', ('cancelled by user', 'paused')),
+    ('rate_limited', ('429', 'too many requests', 'rate limit')),
+    ('network', ('getaddrinfo', 'failed to resolve', 'connection', 'timed out', 'timeout', 'network')),
+    ('not_found', ('no results found', 'lookuperror', 'could not find', 'not found')),
+    ('unavailable', ('unavailable', 'age-restricted', 'confirm your age', 'private video', 'copyright')),
+    ('disk', ('disk space', 'no space left', 'permission denied')),
+    ('ffmpeg', ('ffmpeg', 'conversion', 'postprocess')),
+    ('verification', ('verification', 'truncated', 'decode error', 'missing tags')),
+)
+
+
+def error_class(message: Optional[str]) -> Optional[str]:
+    """Coarse class of an error message, for grouping failures"""
+    if not message:
+        return None
+    lowered = message.lower()
+    for name, needles in ERROR_CLASSES:
+        if any(needle in lowered for needle in needles):
+            return name
+    return 'other'
+
+
+def source_host(line: str) -> Optional[str]:
+    """Host of the first URL in a spotdl output line (where the audio was downloaded from)"""
+    m = re.search(r'https?://(?:www\.)?([^/\s:]+)', line)
+    return m.group(1).lower() if m else None
+
+
+class EventJournal:
+    def __init__(self, directory: Path, retention_days: int = DEFAULT_RETENTION_DAYS):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.retention_days = retention_days
+        self._buffer: List[dict] = []
+        self._lock = threading.Lock()  # guards the buffer
+        self._write_lock = threading.Lock()  # serializes appends
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._pruned_on: Optional[date] = None
+        atexit.register(self.close)
+        threading.Thread(target=self._flush_loop, name='event-journal', daemon=True).start()
+
+    # ---------------------------- Writing ---------------------------- #
+    def record(self, ev: str, task: str, **fields):
+        event = {'ts': round(time.time(), 3), 'ev': ev, 'task': task}
+        event.update((k, v) for k, v in fields.items() if v is not None)
+        with self._lock:
+            self._buffer.append(event)
+            full = len(self._buffer) >= BATCH_SIZE
+        if full:
+            self._wake.set()
+
+    def _path_for(self, day: date) -> Path:
+        return self.directory / f'events-{day.isoformat()}.jsonl'
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+            by_day = defaultdict(list)
+            for event in batch:
+                by_day[date.fromtimestamp(event['ts'])].append(json.dumps(event, separators=(',', ':')))
+            for day, lines in by_day.items():
+                try:
+                    with open(self._path_for(day), 'a', encoding='utf-8') as f:
+                        f.write('\n'.join(lines) + '\n')
+                except OSError as e:
+                    logger.error(f"Could not write {len(lines)} journal event(s): {e}")
+            self._prune()
+
+    def _prune(self):
+        today = date.today()
+        if self._pruned_on == today or self.retention_days <= 0:
+            return
+        self._pruned_on = today
+        cutoff = (today - timedelta(days=self.retention_days)).isoformat()
+        for path in self.directory.glob('events-*.jsonl'):
+            if path.stem[len('events-'):] < cutoff:
+                try:
+                    path.unlink()
+                except OSError as e:
+                    logger.warning(f"Could not delete old journal {path}: {e}")
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(FLUSH_INTERVAL)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Journal flush failed: {e}")
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self.flush()
+
+    # ---------------------------- Reading ---------------------------- #
+    def events(self, since: float, until: Optional[float] = None) -> Iterator[dict]:
+        """Recorded events with since <= ts < until, oldest first (pending ones are flushed first)"""
+        self.flush()
+        until = until or time.time() + 1
+        day, last = date.fromtimestamp(since), date.fromtimestamp(until)
+        while day <= last:
+            try:
+                with open(self._path_for(day), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            event = json.loads(line)
+                        except ValueError:
+                            continue  # torn line from a crash mid-write
+                        if since <= event.get('ts', 0) < until:
+                            yield event
+            except FileNotFoundError:
+                pass
+            day += timedelta(days=1)
+
+    def stats(self, hours: float = 24, bucket_minutes: int = 60, top: int = 10) -> dict:
+        """
+        Aggregates over the last `hours`: finished tracks/bytes/failures per time bucket,
+        failure rates by error class and task type, and sources sorted by their average
+        time per track.
+        """
+        now = time.time()
+        since = now - hours * 3600
+        bucket = bucket_minutes * 60
+        buckets = {}
+        task_kind = {}  # task -> kind it was submitted with
+        tasks = Counter()
+        finished = failed = skipped = 0
+        errors = Counter()
+        task_errors = Counter()
+        by_kind = defaultdict(lambda: {'tracks': 0, 'failed': 0})
+        sources = defaultdict(list)  # host -> [(ms, bytes)]
+
+        for e in self.events(since, now):
+            ev, task = e['ev'], e.get('task')
+            if ev == 'submitted':
+                task_kind[task] = e.get('kind')
+                continue
+            if ev == 'task_finished':
+                tasks[e.get('kind') or 'unknown'] += 1
+                if e.get('err'):
+                    task_errors[e['err']] += 1
+                continue
+            if ev not in ('finished', 'failed', 'skipped'):
+                continue
+            start = int((e['ts'] - since) // bucket) * bucket + since
+            b = buckets.setdefault(start, {'tracks': 0, 'bytes': 0, 'failed': 0, 'skipped': 0})
+            kind = by_kind[task_kind.get(task) or 'unknown']
+            if ev == 'finished':
+                finished += 1
+                kind['tracks'] += 1
+                b['tracks'] += 1
+                b['bytes'] += e.get('bytes') or 0
+                if e.get('src') and e.get('ms') is not None:
+                    sources[e['src']].append((e['ms'], e.get('bytes') or 0))
+            elif ev == 'skipped':
+                skipped += 1
+                b['skipped'] += 1
+            else:
+                failed += 1
+                kind['tracks'] += 1
+                kind['failed'] += 1
+                b['failed'] += 1
+                errors[e.get('err') or 'other'] += 1
+
+        throughput = [
+            {
+                'start': datetime.fromtimestamp(start).isoformat(timespec='seconds'),
+                **b,
+                'mb_per_min': round(b['bytes'] / 1e6 / bucket_minutes, 3),
+            }
+            for start, b in sorted(buckets.items())
+        ]
+        slowest = []
+        for host, samples in sources.items():
+            times = sorted(ms for ms, _ in samples)
+            total_ms = sum(times)
+            slowest.append({
+                'source': host,
+                'tracks': len(times),
+                'avg_ms': int(total_ms / len(times)),
+                'p95_ms': times[min(len(times) - 1, int(len(times) * 0.95))],
+                'kb_per_s': round(sum(b for _, b in samples) / 1000 / (total_ms / 1000), 1) if total_ms else None,
+            })
+        slowest.sort(key=lambda s: s['avg_ms'], reverse=True)
+
+        attempted = finished + failed
+        return {
+            'since': datetime.fromtimestamp(since).isoformat(timespec='seconds'),
+            'bucket_minutes': bucket_minutes,
+            'tasks': {'submitted': len(task_kind), 'finished': dict(tasks), 'errors': dict(task_errors)},
+            'tracks': {'finished': finished, 'failed': failed, 'skipped': skipped},
+            'failure_rate': round(failed / attempted, 4) if attempted else None,
+            'failures_by_class': dict(errors.most_common()),
+            'failure_rate_by_type': {
+                kind: round(v['failed'] / v['tracks'], 4) for kind, v in by_kind.items() if v['tracks']
+            },
+            'throughput': throughput,
+            'slowest_sources': slowest[:top],
+        }
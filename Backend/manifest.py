@@ -0,0 +1,104 @@
+"""
+Manifest - Per-playlist library manifest (M3U playlist plus JSON listing of file hashes)
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from config_store import atomic_write_json
+
+
+logger = logging.getLogger(__name__)
+
+
+def manifest_name(name: str) -> str:
+    """File-system safe base name for a playlist's manifest files"""
+    return re.sub(r'[<>:"/\\|?*\x00-\x1f]', '_', name).strip(' .') or 'library'
+
+
+class LibraryManifest:
+    """
+    `<name>.m3u8` and `<name>.manifest.json` next to the downloaded files. Entries are
+    keyed by track id and remember the size and mtime their hash and verification
+    were computed for, so an update only re-checks files that changed.
+    """
+
+    def __init__(self, directory: Path, name: str, url: str = ''):
+        self.directory = Path(directory)
+        base = manifest_name(name)
+        self.json_path = self.directory / f'{base}.manifest.json'
+        self.m3u_path = self.directory / f'{base}.m3u8'
+        self.data = {'name': name, 'url': url, 'updated_at': None, 'order': [], 'tracks': {}}
+        try:
+            with open(self.json_path, 'r', encoding='utf-8') as f:
+                self.data.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Rebuilding unreadable manifest {self.json_path}: {e}")
+
+    def unchanged(self, track_id: str, path: str) -> bool:
+        """Whether the file is exactly what was verified last time (same size and mtime)"""
+        entry = self.data['tracks'].get(track_id)
+        if not entry or not entry.get('verified'):
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return entry.get('size') == st.st_size and entry.get('mtime') == st.st_mtime
+
+    def update(self, track_id: str, title: str, result: dict):
+        self.data['tracks'][track_id] = {
+            'title': title,
+            'file': os.path.relpath(result['path'], self.directory),
+            'duration': result.get('duration'),
+            'size': result.get('size'),
+            'mtime': result.get('mtime'),
+            'sha256': result.get('sha256'),
+            'verified': result['ok'],
+            'problems': result.get('problems', []),
+        }
+        if track_id not in self.data['order']:
+            self.data['order'].append(track_id)
+
+    def save(self):
+        # Drop entries whose files are gone (pruned or deleted by hand)
+        tracks = self.data['tracks']
+        for track_id in list(tracks):
+            if not (self.directory / tracks[track_id]['file']).exists():
+                tracks.pop(track_id)
+        self.data['order'] = [t for t in self.data['order'] if t in tracks]
+        self.data['updated_at'] = datetime.now().isoformat()
+        atomic_write_json(self.json_path, self.data)
+
+        lines = ['#EXTM3U']
+        for track_id in self.data['order']:
+            entry = tracks[track_id]
+            if not entry.get('verified'):
+                continue
+            lines.append(f"#EXTINF:{int(entry.get('duration') or -1)},{entry['title']}")
+            lines.append(entry['file'].replace(os.sep, '/'))
+        fd, tmp = tempfile.mkstemp(dir=str(self.directory), prefix='.m3u-', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp, self.m3u_path)
+
+    def summary(self) -> dict:
+        tracks = self.data['tracks'].values()
+        return {
+            'm3u': str(self.m3u_path),
+            'json': str(self.json_path),
+            'tracks': len(self.data['tracks']),
+            'verified': sum(1 for t in tracks if t.get('verified')),
+        }
+
+    def get(self, track_id: str) -> Optional[dict]:
+        return self.data['tracks'].get(track_id)
@@ -0,0 +1,286 @@
+"""
+Media Cache - Content-addressed, size-bounded cache of album art and lyrics shared by all tasks
+
+spotdl fetches the cover for every track it tags and searches lyrics on every run.
+For tasks whose songs are resolved up front (sharded downloads, syncs) spotdl runs
+with `--skip-album-art` (and without lyrics providers when the cache has them), and
+the cached art and lyrics are embedded here once each track lands.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+FETCH_TIMEOUT = 10
+TAGGABLE_FORMATS = ('mp3', 'm4a', 'flac', 'opus', 'ogg')  # containers write_tags can embed art into
+
+
+def artwork_key(song: dict) -> Optional[str]:
+    if song.get('album_id'):
+        return f"art:{song['album_id']}"
+    if song.get('cover_url'):
+        return f"art:{hashlib.sha1(song['cover_url'].encode()).hexdigest()}"
+    return None
+
+
+def lyrics_key(song: dict) -> Optional[str]:
+    song_id = song.get('song_id')
+    return f"lyrics:{song_id}" if song_id else None
+
+
+class MediaCache:
+    """
+    Blobs are stored once per content hash under `directory/blobs`; keys (per album
+    for artwork, per track for lyrics) point at them. When the blobs outgrow
+    `max_bytes` the least recently used ones are evicted with their keys.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.blobs_dir = self.directory / 'blobs'
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.key_locks = {}  # key -> Lock, so concurrent shards fetch each cover only once
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(str(self.directory / 'index.db'), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(
+            '''
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS keys (
+                key TEXT PRIMARY KEY,
+                sha TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_blobs_access ON blobs (last_access);
+            '''
+        )
+        self.conn.commit()
+
+    # ---------------------------- Blobs ---------------------------- #
+    def _blob_path(self, sha: str) -> Path:
+        return self.blobs_dir / sha[:2] / sha
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            row = self.conn.execute('SELECT sha FROM keys WHERE key = ?', (key,)).fetchone()
+            if row:
+                self.conn.execute('UPDATE blobs SET last_access = ? WHERE sha = ?', (time.time(), row[0]))
+                self.conn.commit()
+        if not row:
+            self.misses += 1
+            return None
+        try:
+            data = self._blob_path(row[0]).read_bytes()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def has(self, key: str) -> bool:
+        with self.lock:
+            return self.conn.execute('SELECT 1 FROM keys WHERE key = ?', (key,)).fetchone() is not None
+
+    def put(self, key: str, data: bytes):
+        sha = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(sha)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix('.tmp')
+            tmp.write_bytes(data)
+            tmp.replace(path)
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO blobs (sha, size, last_access) VALUES (?, ?, ?)', (sha, len(data), time.time())
+            )
+            self.conn.execute('INSERT OR REPLACE INTO keys (key, sha) VALUES (?, ?)', (key, sha))
+            self.conn.commit()
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop least recently used blobs until the cache fits in max_bytes"""
+        removed = 0
+        with self.lock:
+            total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            for sha, size in self.conn.execute('SELECT sha, size FROM blobs ORDER BY last_access').fetchall():
+                if total <= self.max_bytes:
+                    break
+                self.conn.execute('DELETE FROM keys WHERE sha = ?', (sha,))
+                self.conn.execute('DELETE FROM blobs WHERE sha = ?', (sha,))
+                try:
+                    self._blob_path(sha).unlink()
+                except OSError:
+                    pass
+                total -= size
+                removed += 1
+            self.conn.commit()
+        if removed:
+            logger.info(f"Media cache evicted {removed} blob(s)")
+        return removed
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    # ---------------------------- Artwork & lyrics ---------------------------- #
+    def get_artwork(self, song: dict) -> Optional[bytes]:
+        """Cover image for the song's album, fetched once and then served from the cache"""
+        key = artwork_key(song)
+        if not key:
+            return None
+        with self._key_lock(key):
+            data = self.get(key)
+            if data is not None or not song.get('cover_url'):
+                return data
+            import urllib.request  # slow to import; only needed on a cache miss
+
+            try:
+                with urllib.request.urlopen(song['cover_url'], timeout=FETCH_TIMEOUT) as resp:
+                    data = resp.read()
+            except Exception as e:
+                logger.warning(f"Could not fetch cover {song['cover_url']}: {e}")
+                return None
+            self.put(key, data)
+            return data
+
+    def get_lyrics(self, song: dict) -> Optional[str]:
+        key = lyrics_key(song)
+        data = self.get(key) if key else None
+        return data.decode('utf-8') if data is not None else None
+
+    def has_lyrics(self, song: dict) -> bool:
+        key = lyrics_key(song)
+        return bool(key) and self.has(key)
+
+    def put_lyrics(self, song: dict, lyrics: str):
+        key = lyrics_key(song)
+        if key and lyrics:
+            self.put(key, lyrics.encode('utf-8'))
+
+    # ---------------------------- Tagging ---------------------------- #
+    def embed(self, path: Path, song: dict, lyrics: Optional[str] = None) -> bool:
+        """Write the cached cover (and `lyrics`, if given) into the audio file's tags; False if nothing was written"""
+        cover = self.get_artwork(song)
+        if cover is None and not lyrics:
+            return False
+        try:
+            return write_tags(Path(path), cover, lyrics)
+        except Exception as e:
+            logger.warning(f"Could not embed cached media into {path}: {e}")
+            return False
+
+    def harvest_lyrics(self, path: Path, song: dict) -> bool:
+        """Cache the lyrics spotdl embedded into a freshly downloaded file"""
+        if self.has_lyrics(song):
+            return False
+        try:
+            lyrics = read_lyrics(Path(path))
+        except Exception as e:
+            logger.debug(f"Could not read lyrics from {path}: {e}")
+            return False
+        if not lyrics:
+            return False
+        self.put_lyrics(song, lyrics)
+        return True
+
+    def set_max_bytes(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.evict()
+
+    def stats(self) -> dict:
+        with self.lock:
+            blobs, size = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs').fetchone()
+            keys = self.conn.execute('SELECT COUNT(*) FROM keys').fetchone()[0]
+        return {
+            'blobs': blobs,
+            'keys': keys,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+def write_tags(path: Path, cover: Optional[bytes], lyrics: Optional[str]) -> bool:
+    """Embed `cover`/`lyrics`; returns False for a container it can't tag (e.g. .wav)"""
+    # mutagen ships with spotdl; only needed once a file is actually tagged
+    suffix = path.suffix.lower()
+    if suffix.lstrip('.') not in TAGGABLE_FORMATS:
+        return False
+    if suffix == '.mp3':
+        from mutagen.id3 import APIC, ID3, USLT
+
+        tags = ID3(str(path))
+        if cover is not None:
+            tags.delall('APIC')
+            tags.add(APIC(encoding=3, mime='image/jpeg', type=3, desc='Cover', data=cover))
+        if lyrics:
+            tags.delall('USLT')
+            tags.add(USLT(encoding=3, text=lyrics))
+        tags.save()
+    elif suffix == '.m4a':
+        from mutagen.mp4 import MP4, MP4Cover
+
+        audio = MP4(str(path))
+        if cover is not None:
+            audio['covr'] = [MP4Cover(cover, imageformat=MP4Cover.FORMAT_JPEG)]
+        if lyrics:
+            audio['\xa9lyr'] = lyrics
+        audio.save()
+    elif suffix in ('.flac', '.opus', '.ogg'):
+        from mutagen import File
+        from mutagen.flac import Picture
+
+        audio = File(str(path))
+        if cover is not None:
+            picture = Picture()
+            picture.type = 3
+            picture.desc = 'Cover'
+            picture.mime = 'image/jpeg'
+            picture.data = cover
+            if suffix == '.flac':
+                audio.clear_pictures()
+                audio.add_picture(picture)
+            else:
+                audio['metadata_block_picture'] = [base64.b64encode(picture.write()).decode('ascii')]
+        if lyrics:
+            audio['lyrics'] = lyrics
+        audio.save()
+    return True
+
+
+def read_lyrics(path: Path) -> Optional[str]:
+    suffix = path.suffix.lower()
+    if suffix == '.mp3':
+        from mutagen.id3 import ID3
+
+        frames = ID3(str(path)).getall('USLT')
+        return frames[0].text if frames else None
+    if suffix == '.m4a':
+        from mutagen.mp4 import MP4
+
+        values = (MP4(str(path)).tags or {}).get('\xa9lyr')
+        return values[0] if values else None
+    if suffix in ('.flac', '.opus', '.ogg'):
+        from mutagen import File
+
+        values = (File(str(path)).tags or {}).get('lyrics')
+        return values[0] if values else None
+    return None
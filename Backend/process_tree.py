@@ -0,0 +1,104 @@
+"""
+Process Tree - Start spotdl in its own process group and stop the whole tree (yt-dlp, ffmpeg) at once
+"""
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Iterable
+
+
+logger = logging.getLogger(__name__)
+
+IS_WINDOWS = sys.platform == 'win32'
+
+# Leftovers of interrupted yt-dlp downloads and ffmpeg conversions
+PARTIAL_PATTERNS = ('*.part', '*.part-Frag*', '*.ytdl', '*.temp', '*.tmp')
+
+
+def popen_kwargs() -> dict:
+    """Popen arguments that put the child in a new process group/session"""
+    if IS_WINDOWS:
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+
+def _group_alive(pgid: int) -> bool:
+    try:
+        os.killpg(pgid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def kill_tree(proc: subprocess.Popen, timeout: float = 2.0) -> float:
+    """
+    Terminate `proc` and every process in its group, escalating to a hard kill after
+    `timeout` seconds. Returns the seconds it took until the whole tree was gone.
+    """
+    started = time.monotonic()
+    if IS_WINDOWS:
+        if proc.poll() is None:
+            # /T takes the children (yt-dlp, ffmpeg) with it
+            subprocess.run(
+                ['taskkill', '/T', '/F', '/PID', str(proc.pid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        return time.monotonic() - started
+
+    pgid = proc.pid  # start_new_session makes the child its group leader
+    try:
+        os.killpg(pgid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+
+    deadline = started + timeout
+    while time.monotonic() < deadline:
+        proc.poll()  # reap the leader so it doesn't linger as a zombie in the group
+        if not _group_alive(pgid):
+            break
+        time.sleep(0.02)
+    else:
+        try:
+            os.killpg(pgid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        while _group_alive(pgid) and time.monotonic() < deadline + timeout:
+            proc.poll()
+            time.sleep(0.02)
+
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        logger.warning(f"Process {proc.pid} did not exit after SIGKILL")
+    return time.monotonic() - started
+
+
+def cleanup_partial_files(directory: Path, since: float, patterns: Iterable[str] = PARTIAL_PATTERNS) -> int:
+    """Delete files matching `patterns` in `directory` modified at or after `since` (epoch seconds)"""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return 0
+    removed = 0
+    for pattern in patterns:
+        for path in directory.glob(pattern):
+            try:
+                if path.is_file() and path.stat().st_mtime >= since:
+                    path.unlink()
+                    removed += 1
+            except OSError as e:
+                logger.warning(f"Could not remove partial file {path}: {e}")
+    return removed
@@ -0,0 +1,435 @@
+"""
+Scheduler - Recurring (cron-like) and deferred jobs, off-peak windows and time-of-day bandwidth caps
+"""
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from config_store import atomic_write_json
+from fair_share import DEFAULT_PRIORITY, PRIORITY_WEIGHTS
+
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL = 30.0  # seconds between checks for due jobs
+JOB_KINDS = ('download', 'sync')
+CRON_MACROS = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+RATE_UNITS = {'': 1, 'k': 1024, 'm': 1024 * 1024}
+JOB_FIELD_TYPES = {
+    'url': (str,),
+    'cron': (str, type(None)),
+    'run_at': (str, type(None)),
+    'offpeak': (bool,),
+    'download_path': (str, type(None)),
+    'parallel': (bool, type(None)),
+    'prune': (bool,),
+    'enabled': (bool,),
+}
+
+
+class ScheduleError(ValueError):
+    """Raised when a scheduled job's definition is invalid"""
+
+
+# ---------------------------- Cron ---------------------------- #
+class CronExpression:
+    """
+    Standard five-field cron expression (minute hour day-of-month month day-of-week) with
+    `*`, ranges, steps and lists, plus the @hourly/@daily/@weekly/@monthly macros. Times
+    are local. As in cron, a job restricted by both day fields runs when either matches.
+    """
+
+    FIELDS = (('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 7))
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = CRON_MACROS.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ScheduleError(f"Cron expression needs 5 fields: {expression!r}")
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse_field(text, name, low, high) for text, (name, low, high) in zip(fields, self.FIELDS)
+        )
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse_field(text: str, name: str, low: int, high: int) -> set:
+        values = set()
+        for part in text.split(','):
+            m = re.fullmatch(r'(\*|\d+(?:-\d+)?)(?:/(\d+))?', part)
+            if not m:
+                raise ScheduleError(f"Invalid cron {name} field: {text!r}")
+            base, step = m.group(1), int(m.group(2) or 1)
+            if base == '*':
+                start, end = low, high
+            else:
+                start, _, end = base.partition('-')
+                start = int(start)
+                end = int(end) if end else (high if m.group(2) else start)
+            if step < 1 or not low <= start <= end <= high:
+                raise ScheduleError(f"Invalid cron {name} field: {text!r}")
+            values.update(range(start, end + 1, step))
+        if name == 'weekday':
+            values = {v % 7 for v in values}  # 7 is Sunday too
+        return values
+
+    def _day_matches(self, dt: datetime) -> bool:
+        in_days = dt.day in self.days
+        in_weekdays = (dt.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, dt: datetime) -> datetime:
+        """First matching minute strictly after `dt`"""
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)  # Feb 29 schedules can be years apart
+        while t < limit:
+            if t.month not in self.months or not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ScheduleError(f"Cron expression never matches: {self.expression!r}")
+
+
+# ---------------------------- Time windows ---------------------------- #
+def _minutes(text: str) -> int:
+    hours, minutes = text.strip().split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def parse_windows(text: str) -> List[Tuple[int, int]]:
+    """'23:00-06:00, 12:00-13:00' -> [(start, end)] in minutes after midnight; a window may wrap midnight"""
+    windows = []
+    for part in filter(None, (p.strip() for p in (text or '').split(','))):
+        start, _, end = part.partition('-')
+        windows.append((_minutes(start) % 1440, _minutes(end) % 1440 or 1440))
+    return windows
+
+
+def in_window(now: datetime, window: Tuple[int, int]) -> bool:
+    minute = now.hour * 60 + now.minute
+    start, end = window
+    if start < end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+def in_windows(now: datetime, windows: List[Tuple[int, int]]) -> bool:
+    """Whether `now` falls in one of the windows (no windows: always)"""
+    return not windows or any(in_window(now, w) for w in windows)
+
+
+def next_window_start(now: datetime, windows: List[Tuple[int, int]]) -> Optional[datetime]:
+    if not windows or in_windows(now, windows):
+        return None
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    starts = [midnight + timedelta(days=d, minutes=start) for d in (0, 1) for start, _ in windows]
+    return min(s for s in starts if s > now)
+
+
+def parse_rate(text: str) -> int:
+    """'2M' / '500k' / '0' -> bytes per second (0 = unlimited)"""
+    m = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([kKmM]?)', text.strip())
+    if not m:
+        raise ScheduleError(f"Invalid rate: {text!r}")
+    return int(float(m.group(1)) * RATE_UNITS[m.group(2).lower()])
+
+
+def bandwidth_cap(now: datetime, schedule: str) -> Optional[int]:
+    """
+    Total download rate (bytes/s) allowed at `now` by a schedule like
+    '08:00-23:00=2M, 23:00-08:00=0'; the first matching window wins, None = no cap.
+    """
+    for part in filter(None, (p.strip() for p in (schedule or '').split(','))):
+        window, _, rate = part.partition('=')
+        if in_windows(now, parse_windows(window)):
+            return parse_rate(rate) or None
+    return None
+
+
+# ---------------------------- Jobs ---------------------------- #
+def parse_local_time(text: str) -> datetime:
+    """ISO date/time -> naive local datetime (a UTC offset or trailing Z is converted to local time)"""
+    value = datetime.fromisoformat(text)
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+class Scheduler:
+    """
+    Scheduled jobs, kept in `path` (JSON) so they survive restarts:
+    {
+      'id', 'url', 'kind' ('download' | 'sync'), 'cron' | 'run_at', 'offpeak',
+      'download_path', 'parallel', 'prune', 'priority', 'enabled',
+      'next_run', 'last_run', 'last_task_id', 'last_status', 'runs', 'created_at'
+    }
+
+    A background thread starts due jobs through `launch(job, task_id)`, which hands
+    them to the download manager exactly like an API request. Jobs marked `offpeak`
+    only start inside `offpeak_windows`; a job whose previous run is still active
+    skips its turn. A due time missed while the server was down runs once at startup.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        launch: Callable[[dict, str], None],
+        is_active: Callable[[str], bool],
+        get_config: Callable[[], dict],
+    ):
+        self.path = Path(path)
+        self.launch = launch
+        self.is_active = is_active
+        self.get_config = get_config
+        self.lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.jobs = {}  # job_id -> job
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.jobs = {job['id']: job for job in json.load(f)}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Failed to load schedules from {self.path}: {e}")
+
+    def start(self):
+        """Start firing due jobs (only the server does this, not workers)"""
+        if not self._thread:
+            self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def _save(self):
+        try:
+            atomic_write_json(self.path, list(self.jobs.values()))
+        except OSError as e:
+            logger.error(f"Failed to save schedules: {e}")
+
+    # ---------------------------- Definitions ---------------------------- #
+    @staticmethod
+    def _next_run(job: dict, now: datetime) -> Optional[str]:
+        if job.get('cron'):
+            return CronExpression(job['cron']).next_after(now).isoformat(timespec='seconds')
+        return None
+
+    @staticmethod
+    def _validate(job: dict):
+        """Raise ScheduleError for an invalid job; a run_at with a UTC offset is rewritten as local time"""
+        for field, types in JOB_FIELD_TYPES.items():
+            if not isinstance(job.get(field), types):
+                expected = ' or '.join('null' if t is type(None) else t.__name__ for t in types)
+                raise ScheduleError(f"{field} must be {expected}, got {job.get(field)!r}")
+        if job['kind'] not in JOB_KINDS:
+            raise ScheduleError(f"kind must be one of {', '.join(JOB_KINDS)}")
+        if not isinstance(job['priority'], str) or job['priority'] not in PRIORITY_WEIGHTS:
+            raise ScheduleError(f"priority must be one of {', '.join(PRIORITY_WEIGHTS)}")
+        if job.get('cron') and job.get('run_at'):
+            raise ScheduleError('Give either cron or run_at, not both')
+        if job.get('cron'):
+            CronExpression(job['cron'])
+        if job.get('run_at'):
+            try:
+                run_at = parse_local_time(job['run_at'])
+            except ValueError:
+                raise ScheduleError(f"run_at must be an ISO date/time: {job['run_at']!r}") from None
+            job['run_at'] = run_at.isoformat(timespec='seconds')
+
+    def add(self, spec: dict) -> dict:
+        """
+        Add a job. With `cron` it recurs; with `run_at` it runs once at that time; with
+        neither it runs once as soon as it may (right away, or when the off-peak window opens).
+        """
+        now = datetime.now()
+        job = {
+            'id': str(uuid.uuid4()),
+            'url': spec.get('url'),
+            'kind': spec.get('kind') or 'download',
+            'cron': spec.get('cron') or None,
+            'run_at': spec.get('run_at') or None,
+            'offpeak': spec.get('offpeak', False),
+            'download_path': spec.get('download_path'),
+            'parallel': spec.get('parallel'),
+            'prune': spec.get('prune', False),
+            'priority': spec.get('priority') or DEFAULT_PRIORITY,
+            'enabled': spec.get('enabled', True),
+            'next_run': None,
+            'last_run': None,
+            'last_task_id': None,
+            'last_status': None,
+            'runs': 0,
+            'created_at': now.isoformat(timespec='seconds'),
+        }
+        self._validate(job)
+        job['next_run'] = self._next_run(job, now) or job['run_at'] or now.isoformat(timespec='seconds')
+        with self.lock:
+            self.jobs[job['id']] = job
+            self._save()
+        self._wake.set()
+        logger.info(f"Scheduled {job['kind']} of {job['url']} ({job['cron'] or job['next_run']})")
+        return dict(job)
+
+    def update(self, job_id: str, changes: dict) -> Optional[dict]:
+        editable = ('cron', 'run_at', 'offpeak', 'download_path', 'parallel', 'prune', 'priority', 'enabled')
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job:
+                return None
+            updated = {**job, **{k: v for k, v in changes.items() if k in editable}}
+            self._validate(updated)
+            if any(k in changes for k in ('cron', 'run_at', 'enabled')):
+                now = datetime.now()
+                next_run = self._next_run(updated, now)
+                if not next_run and updated.get('run_at') and (updated['runs'] == 0 or 'run_at' in changes):
+                    next_run = updated['run_at']
+                elif not next_run and updated['runs'] == 0:
+                    next_run = job['next_run'] or now.isoformat(timespec='seconds')
+                updated['next_run'] = next_run
+            self.jobs[job_id] = updated
+            self._save()
+        self._wake.set()
+        return dict(updated)
+
+    def remove(self, job_id: str) -> bool:
+        with self.lock:
+            if not self.jobs.pop(job_id, None):
+                return False
+            self._save()
+        return True
+
+    def run_now(self, job_id: str) -> Optional[str]:
+        """Start a job immediately, outside its schedule and off-peak window"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job:
+                return None
+            task_id = self._fire(job, datetime.now(), advance=False)
+            self._save()
+        return task_id
+
+    # ---------------------------- Firing ---------------------------- #
+    def _fire(self, job: dict, now: datetime, advance: bool = True) -> str:
+        task_id = str(uuid.uuid4())
+        job.update({
+            'last_run': now.isoformat(timespec='seconds'),
+            'last_task_id': task_id,
+            'last_status': 'started',
+            'runs': job.get('runs', 0) + 1,
+        })
+        if advance:
+            job['next_run'] = self._next_run(job, now)
+        try:
+            self.launch(dict(job), task_id)
+        except Exception as e:
+            logger.error(f"Failed to start scheduled job {job['id']}: {e}")
+            job['last_status'] = f'error: {e}'
+        return task_id
+
+    def tick(self, now: Optional[datetime] = None) -> List[str]:
+        """Start every due job that may run now; returns the new task ids"""
+        now = now or datetime.now()
+        windows = parse_windows(self.get_config().get('offpeak_windows', ''))
+        started = []
+        with self.lock:
+            changed = False
+            for job in self.jobs.values():
+                if not job.get('enabled') or not job.get('next_run'):
+                    continue
+                try:
+                    if parse_local_time(job['next_run']) > now:
+                        continue
+                except (TypeError, ValueError):
+                    logger.error(f"Scheduled job {job['id']} has an invalid next_run {job['next_run']!r}; disabling it")
+                    job.update({'enabled': False, 'next_run': None, 'last_status': 'error: invalid next_run'})
+                    changed = True
+                    continue
+                if job.get('offpeak') and not in_windows(now, windows):
+                    if job.get('last_status') != 'waiting for off-peak window':
+                        job['last_status'] = 'waiting for off-peak window'
+                        changed = True
+                    continue
+                changed = True
+                if job.get('last_task_id') and self.is_active(job['last_task_id']):
+                    job['last_status'] = 'skipped: previous run still active'
+                    job['next_run'] = self._next_run(job, now)
+                    continue
+                started.append(self._fire(job, now))
+            if changed:
+                self._save()
+        return started
+
+    def _next_wake(self, now: datetime) -> Optional[datetime]:
+        """
+        When the next job may start: its next_run, or for a due job held back by the
+        off-peak windows, the next window start (not `now` again and again)
+        """
+        windows = parse_windows(self.get_config().get('offpeak_windows', ''))
+        times = []
+        with self.lock:
+            for job in self.jobs.values():
+                if not job.get('enabled') or not job.get('next_run'):
+                    continue
+                try:
+                    at = parse_local_time(job['next_run'])
+                except (TypeError, ValueError):
+                    continue  # tick() disables it
+                if at <= now:
+                    if not job.get('offpeak') or in_windows(now, windows):
+                        continue  # started (or skipped) by the last tick
+                    at = next_window_start(now, windows)
+                times.append(at)
+        return min(times, default=None)
+
+    def _loop(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Scheduler tick failed: {e}")
+            delay = CHECK_INTERVAL
+            try:
+                now = datetime.now()
+                wake = self._next_wake(now)
+                if wake:
+                    delay = max(0.5, min(delay, (wake - now).total_seconds()))
+            except Exception as e:
+                logger.error(f"Scheduler could not work out the next due time: {e}")
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    # ---------------------------- Status ---------------------------- #
+    def list(self) -> List[dict]:
+        with self.lock:
+            return sorted((dict(j) for j in self.jobs.values()), key=lambda j: j.get('next_run') or '~')
+
+    def status(self) -> dict:
+        config = self.get_config()
+        now = datetime.now()
+        windows = parse_windows(config.get('offpeak_windows', ''))
+        next_start = next_window_start(now, windows)
+        return {
+            'offpeak_windows': config.get('offpeak_windows', ''),
+            'in_offpeak_window': in_windows(now, windows),  # no windows: off-peak jobs may run any time
+            'next_offpeak_start': next_start.isoformat(timespec='seconds') if next_start else None,
+            'bandwidth_schedule': config.get('bandwidth_schedule', ''),
+            'bandwidth_cap_bytes_per_sec': bandwidth_cap(now, config.get('bandwidth_schedule', '')),
+            'jobs': self.list(),
+        }
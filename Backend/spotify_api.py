@@ -0,0 +1,136 @@
+"""
+Spotify API - Minimal Spotify Web API client (client-credentials flow, stdlib only)
+"""
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from threading import Lock
+from typing import Iterator, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = 'https://accounts.spotify.com/api/token'
+API_BASE_URL = 'https://api.spotify.com/v1'
+PAGE_SIZE = 50  # the maximum for album and artist-album listings
+
+
+def simplify_track(track: dict, album: dict | None = None) -> Optional[dict]:
+    """Reduce an API track object to the fields GroveGrab tracks (names match spotdl's song dicts)"""
+    if not track or not track.get('id') or track.get('is_local'):
+        return None
+    album = album or track.get('album') or {}
+    artists = [a.get('name', '') for a in track.get('artists', [])]
+    images = album.get('images') or []
+    return {
+        'song_id': track['id'],
+        'url': f"https://open.spotify.com/track/{track['id']}",
+        'name': track.get('name', ''),
+        'artist': artists[0] if artists else '',
+        'artists': artists,
+        'duration': (track.get('duration_ms') or 0) / 1000 or None,
+        'album_id': album.get('id'),
+        'album_name': album.get('name'),
+        'cover_url': images[0].get('url') if images else None,
+    }
+
+
+class SpotifyAPIError(Exception):
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+
+class SpotifyClient:
+    def __init__(self, client_id: str, client_secret: str, timeout: float = 10):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.timeout = timeout
+        self._token: Optional[str] = None
+        self._token_expires = 0.0
+        self._lock = Lock()
+
+    def _get_token(self) -> str:
+        with self._lock:
+            if self._token and time.monotonic() < self._token_expires - 60:
+                return self._token
+
+            credentials = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+            req = urllib.request.Request(
+                TOKEN_URL,
+                data=urllib.parse.urlencode({'grant_type': 'client_credentials'}).encode(),
+                headers={'Authorization': f'Basic {credentials}'},
+                method='POST',
+            )
+            data = self._send(req)
+            self._token = data['access_token']
+            self._token_expires = time.monotonic() + int(data.get('expires_in', 3600))
+            return self._token
+
+    def _send(self, req: urllib.request.Request) -> dict:
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            raise SpotifyAPIError(f"Spotify API error {e.code}: {e.reason}", status=e.code) from e
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise SpotifyAPIError(f"Spotify API request failed: {e}") from e
+
+    def get(self, path: str, **params) -> dict:
+        query = urllib.parse.urlencode({k: v for k, v in params.items() if v is not None})
+        url = f"{API_BASE_URL}/{path.lstrip('/')}" + (f"?{query}" if query else '')
+        req = urllib.request.Request(url, headers={'Authorization': f'Bearer {self._get_token()}'})
+        return self._send(req)
+
+    def get_track_count(self, url_type: str, item_id: str) -> Optional[int]:
+        """Number of tracks in a playlist or album (None for other URL types)"""
+        if url_type == 'playlist':
+            return self.get(f'playlists/{item_id}', fields='tracks.total').get('tracks', {}).get('total')
+        if url_type == 'album':
+            return self.get(f'albums/{item_id}').get('total_tracks')
+        if url_type == 'track':
+            return 1
+        return None
+
+    def iter_pages(self, path: str, **params) -> Iterator[List[dict]]:
+        """Items of a paged endpoint, one page at a time"""
+        offset = 0
+        while True:
+            page = self.get(path, limit=PAGE_SIZE, offset=offset, **params)
+            items = page.get('items') or []
+            yield items
+            offset += len(items)
+            if not items or not page.get('next') or offset >= (page.get('total') or 0):
+                return
+
+    def iter_track_pages(self, url_type: str, item_id: str) -> Iterator[List[dict]]:
+        """
+        Simplified tracks of a playlist, album or artist, one page at a time, so callers
+        can act on the first tracks while the rest are still being listed. An artist
+        expands to the tracks of its albums and singles, album by album.
+        """
+        if url_type == 'track':
+            track = simplify_track(self.get(f'tracks/{item_id}'))
+            yield [track] if track else []
+        elif url_type == 'playlist':
+            for items in self.iter_pages(f'playlists/{item_id}/tracks'):
+                yield [t for t in (simplify_track(i.get('track')) for i in items) if t]
+        elif url_type == 'album':
+            album = self.get(f'albums/{item_id}')
+            for items in self.iter_pages(f'albums/{item_id}/tracks'):
+                yield [t for t in (simplify_track(i, album) for i in items) if t]
+        elif url_type == 'artist':
+            for albums in self.iter_pages(f'artists/{item_id}/albums', include_groups='album,single'):
+                for album in albums:
+                    for items in self.iter_pages(f"albums/{album['id']}/tracks"):
+                        yield [t for t in (simplify_track(i, album) for i in items) if t]
+
+    def get_playlist_snapshot(self, playlist_id: str) -> Optional[str]:
+        """The playlist's snapshot_id, which changes whenever its tracks change"""
+        return self.get(f'playlists/{playlist_id}', fields='snapshot_id').get('snapshot_id')
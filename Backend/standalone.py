@@ -2,12 +2,13 @@
 GroveGrab Standalone Application
 Combines Flask backend with embedded frontend in a single executable
 """
+import startup  # first, so the cold-start timing covers every other import
+
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 import os
 import sys
 import json
-import threading
 import uuid
 import webbrowser
 from pathlib import Path
@@ -33,14 +34,17 @@ print(f"Frontend directory: {FRONTEND_DIR}")
 
 app = Flask(__name__, static_folder=str(FRONTEND_DIR))
 CORS(app)
+startup.mark('imports')
 
 # Import download manager
 try:
     from download_manager import DownloadManager
+    from config_store import ConfigError
     download_manager = DownloadManager()
 except ImportError as e:
     logger.error(f"Failed to import DownloadManager: {e}")
     download_manager = None
+startup.mark('download_manager')
 
 # ============================================================================
 # API Routes
@@ -51,6 +55,8 @@ def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
+        'ready': startup.is_ready(),
+        'startup': startup.report(),
         'timestamp': datetime.now().isoformat()
     })
 
@@ -71,13 +77,16 @@ def handle_config():
     
     elif request.method == 'POST':
         data = request.json
-        success = download_manager.update_config(
-            client_id=data.get('client_id'),
-            client_secret=data.get('client_secret'),
-            default_download_path=data.get('default_download_path'),
-            audio_format=data.get('audio_format'),
-            audio_quality=data.get('audio_quality')
-        )
+        try:
+            success = download_manager.update_config(
+                client_id=data.get('client_id'),
+                client_secret=data.get('client_secret'),
+                download_path=data.get('default_download_path') or data.get('download_path'),
+                audio_format=data.get('audio_format'),
+                audio_quality=data.get('audio_quality')
+            )
+        except ConfigError as e:
+            return jsonify({'error': str(e)}), 400
         
         if success:
             return jsonify({'message': 'Configuration updated successfully'})
@@ -148,6 +157,30 @@ def cancel_task(task_id):
     else:
         return jsonify({'error': 'Failed to cancel task'}), 400
 
+@app.route('/api/tasks/<task_id>/pause', methods=['POST'])
+def pause_task(task_id):
+    """Pause a running task"""
+    if not download_manager:
+        return jsonify({'error': 'Download manager not initialized'}), 500
+    
+    success = download_manager.pause_task(task_id)
+    if success:
+        return jsonify({'message': 'Task paused'})
+    else:
+        return jsonify({'error': 'Failed to pause task'}), 400
+
+@app.route('/api/tasks/<task_id>/resume', methods=['POST'])
+def resume_task(task_id):
+    """Resume a paused task"""
+    if not download_manager:
+        return jsonify({'error': 'Download manager not initialized'}), 500
+    
+    success = download_manager.resume_task(task_id)
+    if success:
+        return jsonify({'message': 'Task resumed'})
+    else:
+        return jsonify({'error': 'Failed to resume task'}), 400
+
 @app.route('/api/tasks/<task_id>/retry', methods=['POST'])
 def retry_task(task_id):
     """Retry a failed task"""
@@ -194,9 +227,7 @@ def serve_frontend(path):
 # ============================================================================
 
 def open_browser():
-    """Open browser after a short delay"""
-    import time
-    time.sleep(1.5)
+    """Open browser (called once the server is accepting connections)"""
     webbrowser.open('http://localhost:5000')
 
 if __name__ == '__main__':
@@ -208,8 +239,5 @@ if __name__ == '__main__':
     print("Press CTRL+C to stop")
     print("=" * 60)
     
-    # Open browser in separate thread
-    threading.Thread(target=open_browser, daemon=True).start()
-    
-    # Start Flask server
-    app.run(host='127.0.0.1', port=5000, debug=False, threaded=True)
+    # Start Flask server; the browser opens as soon as it is ready
+    startup.serve(app, '127.0.0.1', 5000, on_ready=open_browser)
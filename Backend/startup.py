@@ -0,0 +1,69 @@
+"""
+Startup - Cold-start timing and readiness signalling for app.py and standalone.py
+
+Launchers (Electron, the standalone bundle) wait for READY_LINE on stdout, or for
+`/health` to report `"ready": true`, instead of sleeping for a fixed delay.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+READY_LINE = 'GROVEGRAB_READY'
+
+_started = time.perf_counter()
+_last_mark = _started
+_phases: Dict[str, float] = {}
+_ready = threading.Event()
+
+
+def mark(phase: str):
+    """Record how long the startup phase that ends now took"""
+    global _last_mark
+    now = time.perf_counter()
+    _phases[phase] = round((now - _last_mark) * 1000, 1)
+    _last_mark = now
+
+
+def mark_ready():
+    """Report ready on /health; for servers not started through serve() (Flask's debug server)"""
+    _ready.set()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def report() -> dict:
+    return {
+        'ready': is_ready(),
+        'phases_ms': dict(_phases),
+        'total_ms': round(sum(_phases.values()), 1),
+    }
+
+
+def serve(app, host: str, port: int, on_ready: Optional[Callable[[], None]] = None):
+    """Bind the server socket, announce readiness, then serve requests until interrupted"""
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, app, threaded=True)
+    mark('bind')
+    mark_ready()
+
+    timings = ', '.join(f"{phase} {ms:.0f}ms" for phase, ms in _phases.items())
+    logger.info(f"Cold start: {timings} (total {report()['total_ms']:.0f}ms)")
+    print(f"{READY_LINE} http://{'localhost' if host in ('0.0.0.0', '127.0.0.1') else host}:{port}", flush=True)
+
+    if on_ready:
+        threading.Thread(target=on_ready, daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
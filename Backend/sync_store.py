@@ -0,0 +1,61 @@
+"""
+Sync Store - Per-playlist track snapshots used by incremental sync tasks
+"""
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+from config_store import atomic_write_json
+
+
+logger = logging.getLogger(__name__)
+
+
+class SyncStore:
+    """
+    One JSON file per playlist:
+    {
+      'playlist_id', 'url', 'download_path', 'snapshot_id', 'synced_at',
+      'tracks': {song_id: {'url', 'title', 'file'}}
+    }
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, playlist_id: str) -> Path:
+        return self.directory / f"{playlist_id}.json"
+
+    def load(self, playlist_id: str) -> Optional[dict]:
+        path = self._path(playlist_id)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load sync snapshot {playlist_id}: {e}")
+            return None
+
+    def save(self, playlist_id: str, snapshot: dict):
+        atomic_write_json(self._path(playlist_id), snapshot, indent=None)
+
+    def list(self) -> List[dict]:
+        summaries = []
+        for path in sorted(self.directory.glob('*.json')):
+            snapshot = self.load(path.stem)
+            if not snapshot:
+                continue
+            summaries.append({
+                'playlist_id': snapshot.get('playlist_id', path.stem),
+                'url': snapshot.get('url'),
+                'download_path': snapshot.get('download_path'),
+                'snapshot_id': snapshot.get('snapshot_id'),
+                'synced_at': snapshot.get('synced_at'),
+                'track_count': len(snapshot.get('tracks') or {}),
+            })
+        return summaries
@@ -0,0 +1,92 @@
+"""
+Task Archive - SQLite-backed storage for finished tasks evicted from memory
+"""
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class TaskArchive:
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.lock = Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS archived_tasks (
+                id TEXT PRIMARY KEY,
+                type TEXT,
+                status TEXT,
+                url TEXT,
+                created_at TEXT,
+                updated_at TEXT,
+                archived_at TEXT,
+                data TEXT NOT NULL
+            )
+            '''
+        )
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_archived_tasks_updated ON archived_tasks (updated_at DESC)'
+        )
+        self.conn.commit()
+
+    def archive(self, tasks: List[dict]):
+        """Store finished tasks; re-archiving an id replaces the earlier copy"""
+        if not tasks:
+            return
+        now = datetime.now().isoformat()
+        rows = [
+            (
+                t['id'], t.get('type'), t.get('status'), t.get('url'),
+                t.get('created_at'), t.get('updated_at'), now, json.dumps(t),
+            )
+            for t in tasks
+        ]
+        with self.lock:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO archived_tasks '
+                '(id, type, status, url, created_at, updated_at, archived_at, data) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                rows,
+            )
+            self.conn.commit()
+
+    def get(self, task_id: str) -> Optional[dict]:
+        with self.lock:
+            row = self.conn.execute('SELECT data FROM archived_tasks WHERE id = ?', (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, task_id: str) -> bool:
+        with self.lock:
+            cur = self.conn.execute('DELETE FROM archived_tasks WHERE id = ?', (task_id,))
+            self.conn.commit()
+        return cur.rowcount > 0
+
+    def query(self, page: int = 1, per_page: int = 50, status: str | None = None) -> dict:
+        """Newest-first page of archived tasks (without their logs)"""
+        page = max(1, page)
+        per_page = max(1, min(per_page, 500))
+        where, params = ('WHERE status = ?', [status]) if status else ('', [])
+        with self.lock:
+            total = self.conn.execute(f'SELECT COUNT(*) FROM archived_tasks {where}', params).fetchone()[0]
+            rows = self.conn.execute(
+                f'SELECT data FROM archived_tasks {where} ORDER BY updated_at DESC LIMIT ? OFFSET ?',
+                params + [per_page, (page - 1) * per_page],
+            ).fetchall()
+
+        tasks = []
+        for (data,) in rows:
+            task = json.loads(data)
+            task.pop('logs', None)
+            tasks.append(task)
+        return {'tasks': tasks, 'total': total, 'page': page, 'per_page': per_page}
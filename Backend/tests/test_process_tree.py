@@ -0,0 +1,177 @@
+"""
+Cancel-to-resources-freed latency: stopping a task must take spotdl's whole process
+tree (yt-dlp, ffmpeg) down quickly and remove its partial files.
+"""
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+import process_tree
+from process_tree import kill_tree, popen_kwargs
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason='checks POSIX process groups')
+
+LATENCY_BOUND_MS = 3000
+CHILDREN = 2
+
+# Stand-in for spotdl: starts long-running children like yt-dlp/ffmpeg, leaves a partial
+# download behind and then keeps "downloading"
+FAKE_SPOTDL = textwrap.dedent(
+    '''
+    import os, subprocess, sys, time
+    out = sys.argv[sys.argv.index('--output') + 1]
+    os.makedirs(out, exist_ok=True)
+    pids = [
+        subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']).pid
+        for _ in range({children})
+    ]
+    open(os.path.join(out, 'Artist - Song.webm.part'), 'wb').write(b'x' * 1024)
+    with open(os.environ['FAKE_PIDS'] + '.tmp', 'w') as f:
+        f.write(' '.join(map(str, pids)))
+    os.replace(os.environ['FAKE_PIDS'] + '.tmp', os.environ['FAKE_PIDS'])
+    print('Found 1 songs', flush=True)
+    time.sleep(60)
+    '''
+)
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def spawn_tree(script: str) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, **popen_kwargs())
+
+
+def test_kill_tree_stops_children():
+    proc = spawn_tree(
+        'import subprocess, sys, time\n'
+        f'kids = [subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"]) for _ in range({CHILDREN})]\n'
+        'print("up", flush=True)\n'
+        'time.sleep(60)\n'
+    )
+    assert proc.stdout.readline().strip() == b'up'
+
+    elapsed = kill_tree(proc)
+
+    assert not process_tree._group_alive(proc.pid)
+    assert proc.returncode is not None
+    assert elapsed * 1000 < LATENCY_BOUND_MS
+
+
+def test_kill_tree_escalates_when_sigterm_is_ignored():
+    proc = spawn_tree(
+        'import signal, time\n'
+        'signal.signal(signal.SIGTERM, signal.SIG_IGN)\n'
+        'print("up", flush=True)\n'
+        'time.sleep(60)\n'
+    )
+    assert proc.stdout.readline().strip() == b'up'
+
+    elapsed = kill_tree(proc, timeout=0.3)
+
+    assert not process_tree._group_alive(proc.pid)
+    assert proc.returncode == -signal.SIGKILL
+    assert 0.3 <= elapsed < 0.3 + LATENCY_BOUND_MS / 1000
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """DownloadManager whose spotdl is FAKE_SPOTDL"""
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    spotdl = bin_dir / 'spotdl'
+    spotdl.write_text(f'#!{sys.executable}\n' + FAKE_SPOTDL.format(children=CHILDREN))
+    spotdl.chmod(0o755)
+
+    monkeypatch.setenv('PATH', f'{bin_dir}{os.pathsep}{os.environ["PATH"]}')
+    monkeypatch.setenv('GROVEGRAB_DATA_DIR', str(tmp_path / 'data'))
+    monkeypatch.setenv('FAKE_PIDS', str(tmp_path / 'pids'))
+
+    import download_manager
+
+    monkeypatch.setattr(download_manager, 'check_internet_connection', lambda: True)
+    manager = download_manager.DownloadManager(use_queue=False)
+    manager.config_store.update({'admission_control': False, 'verify_downloads': False})
+    return manager
+
+
+def start_runner(manager, out_dir) -> threading.Thread:
+    runner = threading.Thread(
+        target=manager.start_download,
+        args=('t1', 'https://open.spotify.com/track/abc', str(out_dir)),
+        kwargs={'parallel': False},
+        daemon=True,
+    )
+    runner.start()
+    return runner
+
+
+def test_cancel_task_frees_process_group_and_partials(manager, tmp_path):
+    pids_file = tmp_path / 'pids'
+    out_dir = tmp_path / 'out'
+    runner = start_runner(manager, out_dir)
+    assert wait_for(pids_file.exists), 'fake spotdl did not start'
+    with manager.tasks_lock:
+        pgid = manager.processes['t1'][0].pid
+
+    assert manager.cancel_task('t1')
+
+    task = manager.get_task('t1')
+    assert task['status'] == 'cancelled'
+    assert task['cancel_latency_ms'] < LATENCY_BOUND_MS
+    assert not process_tree._group_alive(pgid)
+    assert not list(out_dir.glob('*.part'))
+    runner.join(timeout=10)
+    assert not runner.is_alive()
+
+
+def test_process_started_after_the_cancel_snapshot_is_stopped(manager, tmp_path, monkeypatch):
+    import download_manager
+
+    started = []
+    real_popen = subprocess.Popen
+
+    def popen_then_cancel(*args, **kwargs):
+        # The cancel lands between Popen and the process being registered, so its
+        # snapshot of the task's processes misses this one
+        proc = real_popen(*args, **kwargs)
+        started.append(proc)
+        with manager.tasks_lock:
+            manager.tasks['t1']['cancelled'] = True
+        return proc
+
+    monkeypatch.setattr(download_manager.subprocess, 'Popen', popen_then_cancel)
+    runner = start_runner(manager, tmp_path / 'out')
+    runner.join(timeout=LATENCY_BOUND_MS / 1000 + 5)
+
+    assert not runner.is_alive()
+    assert started and not process_tree._group_alive(started[0].pid)
+    assert manager.get_task('t1')['status'] == 'cancelled'
+
+
+def test_cleanup_keeps_partials_of_a_paused_task(manager, tmp_path):
+    out_dir = tmp_path / 'out'
+    out_dir.mkdir()
+    partial = out_dir / 'Artist - Song.webm.part'
+    partial.write_bytes(b'x')
+    with manager.tasks_lock:
+        manager.tasks['stopped'] = manager._new_task('stopped', 'u1', 'download', str(out_dir))
+        manager.tasks['paused'] = {
+            **manager._new_task('paused', 'u2', 'download', str(out_dir)), 'status': 'paused'
+        }
+        manager.tasks['stopped']['created_at'] = '2000-01-01T00:00:00'
+
+    assert manager._cleanup_partials(manager.tasks['stopped']) == 0
+    assert partial.exists()
@@ -0,0 +1,111 @@
+"""
+Verifier - Post-download integrity checks: duration, decodability and tags of downloaded tracks
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+DURATION_TOLERANCE = 0.05  # fraction of the expected duration a file may fall short by
+MIN_DURATION_TOLERANCE = 5.0  # seconds
+TAIL_SECONDS = 10  # only the end is decoded: that's where a cut-off download breaks
+DECODE_TIMEOUT = 60
+REQUIRED_TAGS = ('title', 'artist')
+# Containers without an "easy" tag interface (WAV, AIFF) expose raw ID3 frames
+ID3_FRAMES = {'title': 'TIT2', 'artist': 'TPE1'}
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def has_tag(tags, name: str) -> bool:
+    if not tags:
+        return False
+    if tags.get(name):
+        return True
+    frame = ID3_FRAMES.get(name)
+    return bool(frame and getattr(tags, 'getall', None) and any(f.text for f in tags.getall(frame)))
+
+
+def verify_file(path: str, expected_duration: Optional[float] = None, decode: bool = True) -> dict:
+    """Check one downloaded file; returns its size/mtime/hash and the problems found"""
+    result = {'path': path, 'ok': False, 'problems': [], 'duration': None, 'size': None, 'mtime': None, 'sha256': None}
+    try:
+        st = os.stat(path)
+    except OSError:
+        result['problems'].append('file missing')
+        return result
+    result.update(size=st.st_size, mtime=st.st_mtime)
+    if st.st_size == 0:
+        result['problems'].append('empty file')
+        return result
+
+    try:
+        from mutagen import File  # ships with spotdl
+
+        audio = File(path, easy=True)
+    except Exception as e:
+        audio = None
+        result['problems'].append(f'unreadable: {e}')
+    else:
+        if audio is None:
+            result['problems'].append('not a recognised audio file')
+
+    if audio is not None:
+        length = getattr(audio.info, 'length', None)
+        result['duration'] = round(length, 2) if length else None
+        if expected_duration and length is not None:
+            tolerance = max(MIN_DURATION_TOLERANCE, expected_duration * DURATION_TOLERANCE)
+            if length < expected_duration - tolerance:
+                result['problems'].append(f'truncated: {length:.0f}s of {expected_duration:.0f}s')
+        missing = [tag for tag in REQUIRED_TAGS if not has_tag(audio.tags, tag)]
+        if missing:
+            result['problems'].append(f"missing tags: {', '.join(missing)}")
+
+    if decode and shutil.which('ffmpeg'):
+        try:
+            proc = subprocess.run(
+                ['ffmpeg', '-v', 'error', '-sseof', f'-{TAIL_SECONDS}', '-i', path, '-f', 'null', '-'],
+                capture_output=True,
+                text=True,
+                timeout=DECODE_TIMEOUT,
+            )
+            if proc.returncode != 0 or proc.stderr.strip():
+                first = (proc.stderr.strip().splitlines() or [f'exit code {proc.returncode}'])[0]
+                result['problems'].append(f'decode error: {first}')
+        except subprocess.TimeoutExpired:
+            result['problems'].append('decode timed out')
+
+    result['sha256'] = file_sha256(path)
+    result['ok'] = not result['problems']
+    return result
+
+
+class Verifier:
+    """
+    Runs verify_file over many files at once. The decoding itself happens in ffmpeg
+    child processes, so a thread per check is enough to keep several cores busy.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or min(8, os.cpu_count() or 2)
+
+    def verify(self, items: Iterable[Tuple[str, Optional[float]]], decode: bool = True) -> List[dict]:
+        items = list(items)
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items)), thread_name_prefix='verify') as pool:
+            return list(pool.map(lambda item: verify_file(item[0], item[1], decode), items))
@@ -0,0 +1,163 @@
+"""
+GroveGrab Worker - Leases download jobs from the shared queue and runs them locally
+
+Start the API server with `execution_mode` set to "queue", then start as many
+workers as needed, on this host or on any host that can reach the queue file:
+
+    python worker.py --slots 2
+    python worker.py --queue /mnt/shared/jobs.db --slots 4
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+from pathlib import Path
+
+from download_manager import DownloadManager, resolve_queue_path
+from job_queue import JobQueue
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Heartbeats carry the task's progress; keep only the tail of its logs to bound row size
+HEARTBEAT_LOG_LINES = 200
+
+
+class Worker:
+    def __init__(
+        self,
+        queue: JobQueue,
+        manager: DownloadManager,
+        worker_id: str,
+        slots: int = 2,
+        poll_interval: float = 2.0,
+        heartbeat_interval: float = 5.0,
+    ):
+        self.queue = queue
+        self.manager = manager
+        self.worker_id = worker_id
+        self.slots = slots
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+
+        self.active = {}  # job_id -> threading.Thread
+        self.active_lock = threading.Lock()
+        self.stopping = threading.Event()
+
+    def run(self):
+        logger.info(f"Worker {self.worker_id} started with {self.slots} slot(s) on {self.queue.db_path}")
+        self.queue.register_worker(self.worker_id, self.slots, [])
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name='worker-heartbeat', daemon=True)
+        heartbeat.start()
+
+        while not self.stopping.is_set():
+            with self.active_lock:
+                for job_id in [j for j, t in self.active.items() if not t.is_alive()]:
+                    self.active.pop(job_id)
+                free = self.slots - len(self.active)
+
+            for _ in range(free):
+                job = self.queue.lease(self.worker_id)
+                if not job:
+                    break
+                self._start_job(job)
+
+            self.stopping.wait(self.poll_interval)
+
+        self._shutdown()
+
+    def stop(self, *_):
+        self.stopping.set()
+
+    def _start_job(self, job: dict):
+        logger.info(f"Leased {job['kind']} job {job['id']} (attempt {job['attempt']})")
+        thread = threading.Thread(target=self._run_job, args=(job,), name=f"job-{job['id'][:8]}", daemon=True)
+        with self.active_lock:
+            self.active[job['id']] = thread
+        thread.start()
+
+    def _run_job(self, job: dict):
+        job_id = job['id']
+        try:
+            self.manager.run_job(job)
+        except Exception as e:
+            logger.error(f"Job {job_id} crashed: {e}")
+
+        task = self.manager.export_task(job_id) or {'id': job_id, 'status': 'failed', 'logs': []}
+        # Leave active before completing, so a heartbeat can't take the finished job for a
+        # lost lease; when stopping, _shutdown hands the job back instead
+        with self.active_lock:
+            handed_back = self.stopping.is_set()
+            if not handed_back:
+                self.active.pop(job_id, None)
+        if not handed_back:
+            self.queue.complete(job_id, self.worker_id, self._trim(task))
+        self.manager.delete_task(job_id)
+
+    def _trim(self, task: dict) -> dict:
+        task['logs'] = task.get('logs', [])[-HEARTBEAT_LOG_LINES:]
+        return task
+
+    def _heartbeat_loop(self):
+        while not self.stopping.wait(self.heartbeat_interval):
+            with self.active_lock:
+                job_ids = list(self.active)
+            self.queue.register_worker(self.worker_id, self.slots, job_ids)
+
+            for job_id in job_ids:
+                task = self.manager.export_task(job_id)
+                reply = self.queue.heartbeat(job_id, self.worker_id, self._trim(task) if task else None)
+                with self.active_lock:
+                    finished = job_id not in self.active  # completed since the snapshot
+                if reply['cancel'] and not finished:
+                    if not reply['leased']:
+                        logger.warning(f"Lost the lease on job {job_id}; stopping it")
+                    self.manager.cancel_task(job_id)
+
+    def _shutdown(self):
+        """Stop running jobs and hand them back to the queue for another worker"""
+        with self.active_lock:
+            active = dict(self.active)
+        for job_id in active:
+            self.manager.cancel_task(job_id)
+        for thread in active.values():
+            thread.join(timeout=10)
+        for job_id in active:
+            self.queue.release(job_id, self.worker_id)
+        self.queue.unregister_worker(self.worker_id)
+        logger.info(f"Worker {self.worker_id} stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GroveGrab download worker')
+    parser.add_argument('--queue', help='Path to the shared jobs.db (default: queue_path from config.json)')
+    parser.add_argument('--slots', type=int, default=2, help='Jobs to run at the same time')
+    parser.add_argument('--worker-id', default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument('--poll-interval', type=float, default=2.0)
+    parser.add_argument('--heartbeat-interval', type=float, default=5.0)
+    args = parser.parse_args()
+
+    # The coordinator archives finished jobs; the worker must keep them until they're exported
+    manager = DownloadManager(use_queue=False, retention=False)
+    queue_path = Path(args.queue) if args.queue else resolve_queue_path(manager.get_config())
+    worker = Worker(
+        JobQueue(queue_path),
+        manager,
+        args.worker_id,
+        slots=max(1, args.slots),
+        poll_interval=args.poll_interval,
+        heartbeat_interval=args.heartbeat_interval,
+    )
+
+    signal.signal(signal.SIGINT, worker.stop)
+    signal.signal(signal.SIGTERM, worker.stop)
+    worker.run()
+
+
+if __name__ == '__main__':
+    main()
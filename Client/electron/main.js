@@ -6,6 +6,44 @@ const fs = require('fs');
 let mainWindow;
 let backendProcess;
 
+const BACKEND_URL = 'http://localhost:5000';
+const READY_LINE = 'GROVEGRAB_READY';
+const READY_TIMEOUT_MS = 30000;
+
+// Resolves once the backend can serve: its ready line on stdout, or /health reporting ready
+// (covers a backend that was already running). Gives up after READY_TIMEOUT_MS.
+function waitForBackend() {
+  return new Promise((resolve) => {
+    let done = false;
+    const finish = (how) => {
+      if (done) return;
+      done = true;
+      clearInterval(poll);
+      clearTimeout(timeout);
+      console.log(`Backend ready (${how})`);
+      resolve();
+    };
+
+    if (backendProcess) {
+      backendProcess.stdout.on('data', (data) => {
+        if (data.toString().includes(READY_LINE)) finish('ready line');
+      });
+      backendProcess.on('close', () => finish('backend exited'));
+    }
+
+    const poll = setInterval(async () => {
+      try {
+        const response = await fetch(`${BACKEND_URL}/health`);
+        const health = await response.json();
+        if (health.ready !== false) finish('health check');
+      } catch (error) {
+        // not listening yet
+      }
+    }, 250);
+    const timeout = setTimeout(() => finish('timeout'), READY_TIMEOUT_MS);
+  });
+}
+
 // Backend server process
 function startBackend() {
   const isProd = app.isPackaged;
@@ -66,14 +104,13 @@ function createWindow() {
   });
 }
 
-app.whenReady().then(() => {
+app.whenReady().then(async () => {
   // Start backend server
   startBackend();
 
-  // Wait for backend to start
-  setTimeout(() => {
-    createWindow();
-  }, 2000);
+  // Show the window as soon as the backend can serve
+  await waitForBackend();
+  createWindow();
 
   app.on('activate', () => {
     if (BrowserWindow.getAllWindows().length === 0) {
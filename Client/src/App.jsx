@@ -86,6 +86,16 @@ function App() {
     await loadTasks()
   }
 
+  const handlePause = async (taskId) => {
+    await apiService.pauseTask(taskId)
+    await loadTasks()
+  }
+
+  const handleResume = async (taskId) => {
+    await apiService.resumeTask(taskId)
+    await loadTasks()
+  }
+
   const handleDelete = async (taskId) => {
     await apiService.deleteTask(taskId)
     await loadTasks()
@@ -324,6 +334,8 @@ function App() {
                   task={task}
                   onRetry={handleRetry}
                   onCancel={handleCancel}
+                  onPause={handlePause}
+                  onResume={handleResume}
                   onDelete={handleDelete}
                   onViewLogs={handleViewLogs}
                 />
@@ -167,6 +167,7 @@ export default function ConfigModal({ isOpen, onClose, onSave, currentConfig })
                   <option value="ogg">OGG</option>
                   <option value="opus">OPUS</option>
                   <option value="m4a">M4A</option>
+                  <option value="native">Native (no re-encode)</option>
                 </select>
               </div>
 
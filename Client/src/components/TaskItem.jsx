@@ -1,6 +1,6 @@
 import { useState } from 'react'
 
-export default function TaskItem({ task, onRetry, onCancel, onDelete, onViewLogs }) {
+export default function TaskItem({ task, onRetry, onCancel, onPause, onResume, onDelete, onViewLogs }) {
   const [showTracks, setShowTracks] = useState(false)
   
   // Filter out "query:" entries from current_track display
@@ -32,6 +32,9 @@ export default function TaskItem({ task, onRetry, onCancel, onDelete, onViewLogs
         return 'text-green-600 dark:text-green-300 bg-green-100 dark:bg-green-500/20 border border-green-300 dark:border-green-500/30';
       case 'failed':
         return 'text-red-600 dark:text-red-300 bg-red-100 dark:bg-red-500/20 border border-red-300 dark:border-red-500/30';
+      case 'pausing':
+      case 'paused':
+        return 'text-yellow-600 dark:text-yellow-300 bg-yellow-100 dark:bg-yellow-500/20 border border-yellow-300 dark:border-yellow-500/30';
       case 'cancelled':
         return 'text-gray-600 dark:text-gray-400 bg-gray-100 dark:bg-gray-700/50 border border-gray-300 dark:border-gray-600';
       default:
@@ -98,7 +101,31 @@ export default function TaskItem({ task, onRetry, onCancel, onDelete, onViewLogs
         </div>
 
         <div className="flex gap-1.5 ml-4">
-          {task.status === 'running' && (
+          {task.status === 'running' && (task.type === 'download' || task.type === 'sync') && (
+            <button
+              onClick={() => onPause(task.id)}
+              className="p-2 text-yellow-600 dark:text-yellow-400 hover:bg-yellow-100 dark:hover:bg-yellow-500/20 rounded-lg transition-all hover:scale-110"
+              title="Pause"
+            >
+              <svg className="h-5 w-5" viewBox="0 0 24 24" fill="none" stroke="currentColor">
+                <path d="M9 6v12M15 6v12" strokeWidth="2" strokeLinecap="round" />
+              </svg>
+            </button>
+          )}
+
+          {task.status === 'paused' && (
+            <button
+              onClick={() => onResume(task.id)}
+              className="p-2 text-purple-600 dark:text-purple-400 hover:bg-purple-100 dark:hover:bg-purple-500/20 rounded-lg transition-all hover:scale-110"
+              title="Resume"
+            >
+              <svg className="h-5 w-5" viewBox="0 0 24 24" fill="none" stroke="currentColor">
+                <path d="M8 5v14l11-7z" strokeWidth="2" strokeLinejoin="round" />
+              </svg>
+            </button>
+          )}
+
+          {['queued', 'running', 'pausing', 'paused'].includes(task.status) && (
             <button
               onClick={() => onCancel(task.id)}
               className="p-2 text-red-600 dark:text-red-400 hover:bg-red-100 dark:hover:bg-red-500/20 rounded-lg transition-all hover:scale-110"
@@ -131,6 +131,24 @@ class ApiService {
     });
   }
 
+  /**
+   * Pause task
+   */
+  async pauseTask(taskId) {
+    return this.request(`/api/tasks/${taskId}/pause`, {
+      method: 'POST',
+    });
+  }
+
+  /**
+   * Resume paused task
+   */
+  async resumeTask(taskId) {
+    return this.request(`/api/tasks/${taskId}/resume`, {
+      method: 'POST',
+    });
+  }
+
   /**
    * Delete task
    */
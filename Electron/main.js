@@ -119,7 +119,8 @@ async function startBackend() {
 
     backendProcess.stdout.on('data', (data) => {
       console.log(`Backend: ${data}`);
-      if (data.toString().includes('Running on')) {
+      // app.py prints this line once its socket is accepting connections
+      if (data.toString().includes('GROVEGRAB_READY')) {
         resolve();
       }
     });
@@ -133,8 +134,10 @@ async function startBackend() {
       reject(error);
     });
 
-    // Timeout after 10 seconds
-    setTimeout(() => resolve(), 10000);
+    backendProcess.on('close', () => resolve());
+
+    // Timeout after 30 seconds
+    setTimeout(() => resolve(), 30000);
   });
 }
 
@@ -240,18 +243,11 @@ app.whenReady().then(async () => {
   
   try {
     // Start backend
-    await startBackend();
-    console.log('Backend started');
-    
-    // Wait a bit for backend to fully initialize
-    await new Promise(resolve => setTimeout(resolve, 2000));
-    
-    // Start frontend
-    await startFrontend();
-    console.log('Frontend started');
-    
-    // Wait a bit for frontend to be ready
-    await new Promise(resolve => setTimeout(resolve, 1000));
+    // Start backend and frontend together; each resolves once it is actually serving
+    await Promise.all([
+      startBackend().then(() => console.log('Backend started')),
+      startFrontend().then(() => console.log('Frontend started')),
+    ]);
     
     // Create window
     createWindow();
@@ -1,11 +1,23 @@
 """
 Build standalone GroveGrab executable with embedded frontend
+
+    python build_standalone.py            # single GroveGrab.exe (unpacks itself on every launch)
+    python build_standalone.py --onedir   # folder build, starts much faster
 """
 import PyInstaller.__main__
+import argparse
 import os
 import shutil
 from pathlib import Path
 
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument(
+    '--onedir',
+    action='store_true',
+    help='Build a folder instead of a single file; skips unpacking spotdl/yt-dlp to a temp dir at every start',
+)
+args = parser.parse_args()
+
 # Get project root
 PROJECT_ROOT = Path(__file__).parent
 BACKEND_DIR = PROJECT_ROOT / "Backend"
@@ -22,6 +34,7 @@ print(f"Project root: {PROJECT_ROOT}")
 print(f"Backend: {BACKEND_DIR}")
 print(f"Frontend dist: {CLIENT_DIST}")
 print(f"Output: {DISTRIBUTION_DIR}")
+print(f"Profile: {'onedir' if args.onedir else 'onefile'}")
 
 # Ensure frontend is built
 if not CLIENT_DIST.exists():
@@ -32,7 +45,7 @@ if not CLIENT_DIST.exists():
 pyinstaller_args = [
     str(BACKEND_DIR / "standalone.py"),  # Main script
     "--name=GroveGrab",  # Name of executable
-    "--onefile",  # Single executable
+    "--onedir" if args.onedir else "--onefile",  # Folder (fast start) or single executable
     "--noconsole",  # No console window
     f"--distpath={DISTRIBUTION_DIR}",  # Output directory
     f"--workpath={PROJECT_ROOT / 'build'}",  # Working directory
@@ -78,5 +91,6 @@ pyinstaller_args = [
 print("\nRunning PyInstaller...")
 PyInstaller.__main__.run(pyinstaller_args)
 
-print(f"\n✓ Build complete! Executable: {DISTRIBUTION_DIR / 'GroveGrab.exe'}")
+executable = DISTRIBUTION_DIR / 'GroveGrab' / 'GroveGrab.exe' if args.onedir else DISTRIBUTION_DIR / 'GroveGrab.exe'
+print(f"\n✓ Build complete! Executable: {executable}")
 print(f"✓ You can now run the application from: {DISTRIBUTION_DIR}")